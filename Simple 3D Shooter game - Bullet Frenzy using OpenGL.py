@@ -20,10 +20,13 @@
 from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
+from frame_scheduler import FrameScheduler
+from bitmap_text import HudLayer, draw_string
 
 # import time
 import math
 import random
+import numpy
 
 
 #flags
@@ -35,9 +38,135 @@ is_first_person = False
 auto_shoot_enabled = True
 end = False
 
+#entities kept as parallel numpy arrays, the first `count` rows are alive
+class EntityStore:
+    FIELDS = ("pos", "prev_pos", "vel", "scale", "prev_scale", "dscale", "lod")
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.pos = numpy.zeros((capacity, 3)) #x, y, z
+        self.prev_pos = numpy.zeros((capacity, 3)) #pos before the last tick, for interpolation
+        self.vel = numpy.zeros((capacity, 3)) #direction for bullets
+        self.scale = numpy.zeros(capacity) #pulse size for enemies
+        self.prev_scale = numpy.zeros(capacity)
+        self.dscale = numpy.zeros(capacity) #pulse speed for enemies (per second)
+        self.lod = numpy.zeros(capacity) #level of detail the entity was last drawn with
+
+    def __len__(self):
+        return self.count
+
+    def grow(self):
+        cap = 2 * len(self.pos)
+        for name in self.FIELDS:
+            old = getattr(self, name)
+            new = numpy.zeros((cap,) + old.shape[1:])
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def set(self, i, pos, vel=(0, 0, 0), scale=1.0, dscale=0.0):
+        self.pos[i] = pos
+        self.prev_pos[i] = pos #new entities don't slide in from the old slot
+        self.vel[i] = vel
+        self.scale[i] = scale
+        self.prev_scale[i] = scale
+        self.dscale[i] = dscale
+
+    def save_prev(self):
+        self.prev_pos[:self.count] = self.pos[:self.count]
+        self.prev_scale[:self.count] = self.scale[:self.count]
+
+    #positions / scales drawn alpha (0..1) of the way from the previous tick to the current one
+    def lerp_pos(self, alpha):
+        n = self.count
+        return self.prev_pos[:n] + (self.pos[:n] - self.prev_pos[:n]) * alpha
+
+    def lerp_scale(self, alpha):
+        n = self.count
+        return self.prev_scale[:n] + (self.scale[:n] - self.prev_scale[:n]) * alpha
+
+    def add(self, pos, vel=(0, 0, 0), scale=1.0, dscale=0.0):
+        if self.count == len(self.pos):
+            self.grow()
+        self.set(self.count, pos, vel, scale, dscale)
+        self.count += 1
+
+    #swap-and-pop: the last live row moves into each removed slot
+    def remove(self, idx):
+        for i in sorted(set(idx), reverse=True):
+            last = self.count - 1
+            if i != last:
+                for name in self.FIELDS:
+                    arr = getattr(self, name)
+                    arr[i] = arr[last]
+            self.count = last
+
+    #keep only the live rows where mask is True, in one go
+    def keep(self, mask):
+        n = int(mask.sum())
+        if n == self.count:
+            return
+        for name in self.FIELDS:
+            arr = getattr(self, name)
+            arr[:n] = arr[:self.count][mask]
+        self.count = n
+
+    def clear(self):
+        self.count = 0
+
+
+#enemy slots sorted by bearing (radians, -pi..pi) from the player. Enemies walk straight
+#at the player, so a bearing only changes when its enemy respawns or the player moves:
+#update() re-sorts everything only after a player move, otherwise it just takes out the
+#slots passed to touch() and puts them back in at their new bearing
+class BearingIndex:
+    def __init__(self):
+        self.origin = None
+        self.bearing = numpy.empty(0) #per slot
+        self.order = numpy.empty(0, dtype=numpy.int64)
+        self.sorted = numpy.empty(0)
+        self.dirty = set()
+
+    #slot i holds a new enemy
+    def touch(self, i):
+        self.dirty.add(i)
+
+    def update(self, pos, origin):
+        n = len(pos)
+        if origin != self.origin or n != len(self.bearing):
+            self.origin = origin
+            self.bearing = numpy.arctan2(pos[:, 1] - origin[1], pos[:, 0] - origin[0])
+            self.order = numpy.argsort(self.bearing, kind="stable")
+            self.sorted = self.bearing[self.order]
+        elif self.dirty:
+            idx = numpy.array(sorted(self.dirty), dtype=numpy.int64)
+            moved = numpy.zeros(n, dtype=bool)
+            moved[idx] = True
+            keep = ~moved[self.order]
+            order, srt = self.order[keep], self.sorted[keep]
+
+            bearing = numpy.arctan2(pos[idx, 1] - origin[1], pos[idx, 0] - origin[0])
+            self.bearing[idx] = bearing
+            by = numpy.argsort(bearing, kind="stable")
+            at = numpy.searchsorted(srt, bearing[by], "right")
+            self.order = numpy.insert(order, at, idx[by])
+            self.sorted = numpy.insert(srt, at, bearing[by])
+        self.dirty.clear()
+
+    #slots with a bearing within half_width of center, wrapping around at -pi/pi
+    def query(self, center, half_width):
+        lo = (center - half_width + math.pi) % (2 * math.pi) - math.pi
+        hi = (center + half_width + math.pi) % (2 * math.pi) - math.pi
+        a = numpy.searchsorted(self.sorted, lo, "left")
+        b = numpy.searchsorted(self.sorted, hi, "right")
+        if lo <= hi:
+            return self.order[a:b]
+        return numpy.concatenate((self.order[a:], self.order[:b]))
+
+
 #arrays
-enemies = [] #to store 5 enemies
-bullets = [] 
+enemies = EntityStore() #to store 5 enemies
+bullets = EntityStore(256)
+enemy_bearings = BearingIndex()
 
 #globals
 player_yaw_deg = 270 #player player_yaw_deg 
@@ -47,6 +176,7 @@ camera_radius = 500
 camera_height = 420
 
 fovY = 122
+ASPECT, Z_NEAR, Z_FAR = 1.25, 0.1, 1500 #rest of the gluPerspective() call
 TILE_SIZE = 90
 ENEMY_COUNT  = 5
 player_lives  = 5
@@ -59,89 +189,244 @@ BOARD_SIZE = TILE_SIZE * NUM_TILES
 HALF_BOARD = BOARD_SIZE // 2    
 ENEMY_SPAWN_MARGIN = 55 # keep enemies a bit inside the wall
 
+TARGET_FPS = 60 # redraw rate
+SIM_HZ = 240 # game updates per second, any rate gives the same game speed
+TICK = 1.0 / SIM_HZ
+
+#speeds per second
+BULLET_SPEED = 3600
+ENEMY_SPEED = 12
+ENEMY_PULSE_SPEED = 0.72 #enemy scale change
+CHEAT_TURN_SPEED = 168 #degrees
+
+#the cheat gun fires at enemies within acos(0.99) of the gun ray, measured from the muzzle
+#(50 to the side, 140 ahead), so seen from the player they are within this angle of the gun
+CHEAT_WINDOW = math.atan2(50, 140) + math.acos(0.99)
+
+render_alpha = 0.0 #how far the drawing is between the last two ticks
+prev_player_yaw_deg = 270
+
+scheduler = FrameScheduler(TARGET_FPS, sim_hz=SIM_HZ, name="Bullet Frenzy")
+
+#display lists of the model parts, compiled on first use and replayed after that
+mesh_lists = {}
+mesh_quadric = None
+floor_chunks = [] #(display list, box min, box max) per FLOOR_CHUNK x FLOOR_CHUNK block of tiles
+floor_key = None #(NUM_TILES, TILE_SIZE) the floor lists were built for
+FLOOR_CHUNK = 4
+
+frustum_planes = None #(6, 4) plane equations of the current view, set by setup_camera()
+
+#level of detail: (slices, stacks) per level, nearest first
+ENEMY_BODY_LODS = ((21, 21), (14, 14), (8, 8))
+ENEMY_HEAD_LODS = ((11, 11), (8, 8), (5, 5))
+PLAYER_LODS = ((10, 10), (7, 6), (5, 4))
+LOD_DISTANCES = (450, 900) #camera distance where level 1 / level 2 start
+LOD_HYSTERESIS = 0.1 #switch only this fraction past a threshold, so nothing flickers at the edge
+
+camera_eye = (0, 0, 0) #set by setup_camera()
+player_lod = 0
+
+hud_layer = HudLayer() #HUD text kept in a texture, redrawn only when its values change
+
 
 #draw text in is_game_running
 def draw_text(x, y, text, font):
-    p,q = x,y
     glColor3f(.9,.9,1)
-    glMatrixMode(GL_PROJECTION)
-    glPushMatrix()
-    glLoadIdentity()
-    gluOrtho2D(0, 1000, 0, 800)
-    glMatrixMode(GL_MODELVIEW)
-    glPushMatrix()
-    glLoadIdentity()
-    glRasterPos2f(p,q)
-    for i in text:
-        glutBitmapCharacter(font, ord(i))
-    glPopMatrix()
-    glMatrixMode(GL_PROJECTION)
-    glPopMatrix()
-    glMatrixMode(GL_MODELVIEW)
+    draw_string(x, y, text, font)
+
+#HUD lines in the 1000 x 800 text space, painted into hud_layer
+def draw_hud():
+    if is_game_running:
+        draw_text(10, 790, f"Player Life Remainig: {player_lives}",GLUT_BITMAP_TIMES_ROMAN_24)
+        draw_text(10, 760, f"Game Score  : {score} ",GLUT_BITMAP_TIMES_ROMAN_24)
+        if is_cheat_mode:
+            draw_text(10, 730, f"Player Bullet Missed : {0} ",GLUT_BITMAP_TIMES_ROMAN_24)
+        else:
+            draw_text(10, 730, f"Player Bullet Missed : {missed_bullets} ",GLUT_BITMAP_TIMES_ROMAN_24)
 
 
-#grid floor drawing 13x13
-def draw_checkerboard():
-    global TILE_SIZE
-    half = (13 * TILE_SIZE) // 2
+    else:
+        draw_text(10, 790, f"Game is Over. Score is {score}.",GLUT_BITMAP_TIMES_ROMAN_24)
+        draw_text(10, 760, f'Press <R> to RESTART',GLUT_BITMAP_TIMES_ROMAN_24)
 
-    for r in range(13):
-        for j in range(13):
-            x1 = -half + j * TILE_SIZE
-            y1 = -half + r * TILE_SIZE
-            x2 = x1 + TILE_SIZE
-            y2 = y1 + TILE_SIZE
 
+#view frustum planes (a, b, c, d with inside >= 0) from the gluPerspective() and gluLookAt()
+#arguments, building the same matrices on the CPU instead of reading them back from GL
+def update_frustum(eye, center, up, fovy, aspect, near, far):
+    global frustum_planes
+    f = 1 / math.tan(math.radians(fovy) / 2)
+    proj = numpy.array([[f / aspect, 0, 0, 0],
+                        [0, f, 0, 0],
+                        [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+                        [0, 0, -1, 0]])
+    eye = numpy.asarray(eye, dtype=numpy.float64)
+    fwd = numpy.asarray(center, dtype=numpy.float64) - eye
+    fwd /= numpy.linalg.norm(fwd)
+    side = numpy.cross(fwd, up)
+    side /= numpy.linalg.norm(side)
+    view = numpy.identity(4)
+    view[0, :3], view[1, :3], view[2, :3] = side, numpy.cross(side, fwd), -fwd
+    view[:3, 3] = -view[:3, :3] @ eye
+    clip = proj @ view
+    planes = numpy.array([clip[3] + clip[0], clip[3] - clip[0],  #left, right
+                          clip[3] + clip[1], clip[3] - clip[1],  #bottom, top
+                          clip[3] + clip[2], clip[3] - clip[2]]) #near, far
+    frustum_planes = planes / numpy.linalg.norm(planes[:, :3], axis=1)[:, None]
+
+
+#which spheres are at least partly inside the frustum
+def spheres_visible(centers, radii):
+    if frustum_planes is None:
+        return numpy.ones(len(centers), dtype=bool)
+    dist = centers @ frustum_planes[:, :3].T + frustum_planes[:, 3]
+    return (dist > -numpy.asarray(radii, dtype=numpy.float64).reshape(-1, 1)).all(axis=1)
+
+
+#is an axis aligned box at least partly inside the frustum (tests the corner furthest along each plane normal)
+def box_visible(lo, hi):
+    if frustum_planes is None:
+        return True
+    far_corner = numpy.where(frustum_planes[:, :3] > 0, hi, lo)
+    return bool(((far_corner * frustum_planes[:, :3]).sum(axis=1) + frustum_planes[:, 3] >= 0).all())
+
+
+#grid floor drawing NUM_TILES x NUM_TILES, one display list per chunk of tiles so chunks can be culled
+def build_checkerboard():
+    half = (NUM_TILES * TILE_SIZE) // 2
+    chunks = []
+    for r0 in range(0, NUM_TILES, FLOOR_CHUNK):
+        for j0 in range(0, NUM_TILES, FLOOR_CHUNK):
+            r1 = min(r0 + FLOOR_CHUNK, NUM_TILES)
+            j1 = min(j0 + FLOOR_CHUNK, NUM_TILES)
+            lst = glGenLists(1)
+            glNewList(lst, GL_COMPILE)
             glBegin(GL_QUADS)
-            if (r + j) % 2 == 0:
-                glColor3f(1, 1, 1) # white
-            else:
-                glColor3f(0.7, 0.5, 0.95) # purple
-            glVertex3f(x1, y1, 0)
-            glVertex3f(x2, y1, 0)
-            glVertex3f(x2, y2, 0)
-            glVertex3f(x1, y2, 0)
+            for r in range(r0, r1):
+                for j in range(j0, j1):
+                    x1 = -half + j * TILE_SIZE
+                    y1 = -half + r * TILE_SIZE
+                    x2 = x1 + TILE_SIZE
+                    y2 = y1 + TILE_SIZE
+
+                    if (r + j) % 2 == 0:
+                        glColor3f(1, 1, 1) # white
+                    else:
+                        glColor3f(0.7, 0.5, 0.95) # purple
+                    glVertex3f(x1, y1, 0)
+                    glVertex3f(x2, y1, 0)
+                    glVertex3f(x2, y2, 0)
+                    glVertex3f(x1, y2, 0)
             glEnd()
+            glEndList()
+            lo = numpy.array([-half + j0 * TILE_SIZE, -half + r0 * TILE_SIZE, 0])
+            hi = numpy.array([-half + j1 * TILE_SIZE, -half + r1 * TILE_SIZE, 0])
+            chunks.append((lst, lo, hi))
+    return chunks
+
+
+def draw_checkerboard():
+    global floor_chunks, floor_key
+    if floor_key != (NUM_TILES, TILE_SIZE): #board changed (or first frame), rebuild
+        for lst, lo, hi in floor_chunks:
+            glDeleteLists(lst, 1)
+        floor_chunks = build_checkerboard()
+        floor_key = (NUM_TILES, TILE_SIZE)
+    for lst, lo, hi in floor_chunks:
+        if box_visible(lo, hi):
+            glCallList(lst)
 
 
 
 def draw_walls():
     ht = TILE_SIZE * 1.5
+    H = HALF_BOARD
+    walls = (
+        ((0, 1, 0), ((-H, -H, 0), (-H,  H, 0), (-H,  H, ht), (-H, -H, ht))), # Left wall
+        ((0, 0, 1), (( H, -H, 0), ( H,  H, 0), ( H,  H, ht), ( H, -H, ht))), # Right wall
+        ((0, 1, 1), ((-H, -H, 0), ( H, -H, 0), ( H, -H, ht), (-H, -H, ht))), # Bottom wall
+        ((1, 1, 1), ((-H,  H, 0), ( H,  H, 0), ( H,  H, ht), (-H,  H, ht))), # Top wall
+    )
     glBegin(GL_QUADS)
-    # Left wall
-    glColor3f(0, 1, 0)
-    glVertex3f(-HALF_BOARD, -HALF_BOARD, 0)
-    glVertex3f(-HALF_BOARD,  HALF_BOARD, 0)
-    glVertex3f(-HALF_BOARD,  HALF_BOARD, ht)
-    glVertex3f(-HALF_BOARD, -HALF_BOARD, ht)
-    # Right wall
-    glColor3f(0, 0, 1)
-    glVertex3f( HALF_BOARD, -HALF_BOARD, 0)
-    glVertex3f( HALF_BOARD,  HALF_BOARD, 0)
-    glVertex3f( HALF_BOARD,  HALF_BOARD, ht)
-    glVertex3f( HALF_BOARD, -HALF_BOARD, ht)
-    # Bottom wall
-    glColor3f(0, 1, 1)
-    glVertex3f(-HALF_BOARD, -HALF_BOARD, 0)
-    glVertex3f( HALF_BOARD, -HALF_BOARD, 0)
-    glVertex3f( HALF_BOARD, -HALF_BOARD, ht)
-    glVertex3f(-HALF_BOARD, -HALF_BOARD, ht)
-    # Top wall
-    glColor3f(1, 1, 1)
-    glVertex3f(-HALF_BOARD,  HALF_BOARD, 0)
-    glVertex3f( HALF_BOARD,  HALF_BOARD, 0)
-    glVertex3f( HALF_BOARD,  HALF_BOARD, ht)
-    glVertex3f(-HALF_BOARD,  HALF_BOARD, ht)
+    for color, corners in walls:
+        corners = numpy.array(corners, dtype=numpy.float64)
+        if not box_visible(corners.min(axis=0), corners.max(axis=0)):
+            continue
+        glColor3f(*color)
+        for corner in corners:
+            glVertex3f(*corner)
     glEnd()
 
 
+#compile a gluCylinder / gluSphere into a display list once
+def get_mesh(kind, *params):
+    global mesh_quadric
+    key = (kind,) + params
+    lst = mesh_lists.get(key)
+    if lst is None:
+        if mesh_quadric is None:
+            mesh_quadric = gluNewQuadric() #one quadric for every mesh
+        lst = glGenLists(1)
+        glNewList(lst, GL_COMPILE)
+        if kind == "cylinder":
+            gluCylinder(mesh_quadric, *params)
+        else:
+            gluSphere(mesh_quadric, *params)
+        glEndList()
+        mesh_lists[key] = lst
+    return lst
+
+
+#compile every level of every model up front, so switching levels never builds a list mid-game
+def build_meshes():
+    for slices, stacks in ENEMY_BODY_LODS:
+        get_mesh("sphere", 40, slices, stacks)
+    for slices, stacks in ENEMY_HEAD_LODS:
+        get_mesh("sphere", 19, slices, stacks)
+    for slices, stacks in PLAYER_LODS:
+        for params in ((15, 7, 80), (15, 3, 100), (12, 5, 50)):
+            get_mesh("cylinder", *params, slices, stacks)
+        get_mesh("sphere", 28, slices, stacks)
+
+
+#new levels for camera distances, given the levels used last frame; a level is only left once
+#the distance is LOD_HYSTERESIS past its threshold
+def lod_levels(levels, distances):
+    limits = numpy.array(LOD_DISTANCES)
+    coarsest = numpy.searchsorted(limits * (1 - LOD_HYSTERESIS), distances, "right")
+    finest = numpy.searchsorted(limits * (1 + LOD_HYSTERESIS), distances, "left")
+    return numpy.clip(numpy.asarray(levels, dtype=numpy.int64), finest, coarsest)
+
+
+def camera_distance(x, y, z):
+    ex, ey, ez = camera_eye
+    return numpy.sqrt((x - ex)**2 + (y - ey)**2 + (z - ez)**2)
+
+
+def draw_cylinder(base, top, height, slices, stacks):
+    glCallList(get_mesh("cylinder", base, top, height, slices, stacks))
+
+
+def draw_sphere(radius, slices, stacks):
+    glCallList(get_mesh("sphere", radius, slices, stacks))
+
+
+#player yaw interpolated between the last two ticks (the cheat turret turns every tick)
+def drawn_yaw_deg():
+    turn = (player_yaw_deg - prev_player_yaw_deg + 180) % 360 - 180
+    return prev_player_yaw_deg + turn * render_alpha
+
+
 def draw_player():
-    global player_x,player_y,is_game_running,player_yaw_deg,bullet_hit_flag,player_lives
+    global player_x,player_y,is_game_running,player_yaw_deg,bullet_hit_flag,player_lives,player_lod
+
+    player_lod = int(lod_levels([player_lod], numpy.array([camera_distance(player_x, player_y, 0)]))[0])
+    slices, stacks = PLAYER_LODS[player_lod]
 
     #player_model
     glPushMatrix()
     glTranslatef(player_x,player_y,0)
-    glRotatef(player_yaw_deg, 0, 0, 1)  
+    glRotatef(drawn_yaw_deg(), 0, 0, 1)  
     if is_game_running==False :
         glRotatef(90,0,1,0) #laying down the player in floor
 
@@ -149,10 +434,10 @@ def draw_player():
     glColor3f(0, 0, 1)
     glTranslatef(0,-15,-90)
     glRotatef(180, 0, 1, 0)
-    gluCylinder(gluNewQuadric(), 15, 7, 80, 10, 10) #quadric, base radius, top radius, height, slices, stacks
+    draw_cylinder(15, 7, 80, slices, stacks) #base radius, top radius, height, slices, stacks
     glColor3f(0, 0, 1)
     glTranslatef(0,-75,0)
-    gluCylinder(gluNewQuadric(), 15, 7, 80, 10, 10) 
+    draw_cylinder(15, 7, 80, slices, stacks)
 
     #body
     glColor3f(0.4, 0.5, 0)
@@ -164,39 +449,38 @@ def draw_player():
     glTranslatef(0, 0, 15)
     glTranslatef(30, 0, -40) 
     glRotatef(90, 0, 1, 0)
-    gluCylinder(gluNewQuadric(), 15, 3, 100, 10, 10) 
+    draw_cylinder(15, 3, 100, slices, stacks)
   
 
     #hand
     glColor3f(1, 0.7, 0.6)
     glTranslatef(0, -25, 0)
-    gluCylinder(gluNewQuadric(), 12, 5, 50, 10, 10) 
+    draw_cylinder(12, 5, 50, slices, stacks)
 
     glColor3f(1, 0.7, 0.6)
     glTranslatef(0, 50, 0)
-    gluCylinder(gluNewQuadric(), 12, 5, 50, 10, 10) 
+    draw_cylinder(12, 5, 50, slices, stacks)
 
     # head
     glColor3f(0, 0, 0)
     glTranslatef(40,-25, -18)
-    gluSphere(gluNewQuadric(), 28, 10, 10)
+    draw_sphere(28, slices, stacks)
 
     glPopMatrix()
 
 #ememies maker
-def draw_enemy(e):
-    x,y,s = e[0],e[1],e[3]
+def draw_enemy(x, y, s, lod=0):
     glPushMatrix()
     glTranslatef(x, y, 0)
     glScalef(s, s, s)
     
     glColor3f(1, 0, 0)
     glTranslatef(0, 0, 40)
-    gluSphere(gluNewQuadric(), 40, 21, 21)
+    draw_sphere(40, *ENEMY_BODY_LODS[lod])
 
     glColor3f(0,0,0)
     glTranslatef(0, 0, 45)
-    gluSphere(gluNewQuadric(), 19, 11, 11)
+    draw_sphere(19, *ENEMY_HEAD_LODS[lod])
     glPopMatrix()
 
 def spawn_enemy(): #enemies spawn
@@ -205,18 +489,30 @@ def spawn_enemy(): #enemies spawn
         x = random.randint(-(HALF_BOARD - ENEMY_SPAWN_MARGIN), (HALF_BOARD - ENEMY_SPAWN_MARGIN))
         if abs(x) > 150 or abs(y) > 150:
             break
-    return [x, y, 0, 1.1, .003]
+    return x, y
+
+
+def add_enemy():
+    x, y = spawn_enemy()
+    enemies.add((x, y, 0), scale=1.1, dscale=ENEMY_PULSE_SPEED)
+    enemy_bearings.touch(enemies.count - 1)
+
+
+def respawn_enemy(i): #reuse slot i for a fresh enemy
+    x, y = spawn_enemy()
+    enemies.set(i, (x, y, 0), scale=1.1, dscale=ENEMY_PULSE_SPEED)
+    enemy_bearings.touch(i)
 
 #assigning x and y pos of five enemies
 for i in range(ENEMY_COUNT):
-    enemies.append(spawn_enemy())
+    add_enemy()
 
 #bullets
 def draw_bullets():
     global bullets,is_cheat_mode
     glColor3f(1, 0, 0)
-    for i in bullets:
-        x,y,z = i[0],i[1],i[2]
+    bpos = bullets.lerp_pos(render_alpha)
+    for x, y, z in bpos[spheres_visible(bpos, 15 * math.sqrt(3) / 2)]: #sphere around a cube of 15 (corner to centre)
         glPushMatrix()
         glTranslatef(x,y,z)
         if is_cheat_mode:
@@ -229,20 +525,19 @@ def draw_bullets():
 #brush fire
 def update_bullets():
     global bullets, is_game_running, missed_bullets, player_lives, enemies, is_cheat_mode, bullet_hit_flag,score
-    for shot in bullets:
-            shot[0] += shot[3] * 15
-            shot[1] += shot[4] * 15
-
-    k = 0
-    while k < len(bullets):
-        if abs(bullets[k][0]) >= HALF_BOARD or abs(bullets[k][1]) >= HALF_BOARD:
-            bullets.pop(k)
-            if  not is_cheat_mode and not bullet_hit_flag and missed_bullets<=10:
+    n = bullets.count
+    pos = bullets.pos[:n]
+    pos[:, :2] += bullets.vel[:n, :2] * (BULLET_SPEED * TICK)
+
+    out = (numpy.abs(pos[:, 0]) >= HALF_BOARD) | (numpy.abs(pos[:, 1]) >= HALF_BOARD)
+    lost = int(out.sum())
+    if lost:
+        bullets.keep(~out)
+        if  not is_cheat_mode and not bullet_hit_flag and missed_bullets<=10:
+            # Increment missed bullets count
+            for k in range(min(lost, 11 - missed_bullets)):
                 missed_bullets += 1
                 print(f'Missed fire : {missed_bullets}')
-              # Increment missed bullets count
-        else:
-            k += 1
     
     if missed_bullets >= 10 or player_lives == 0:
             is_game_running = False
@@ -254,36 +549,32 @@ def update_bullets():
 def update_enemies():
     global  missed_bullets, score, player_lives, is_game_running, player_x, player_y,enemies,end
 
-    for i in enemies:
-        dx = player_x - i[0]
-        dy = player_y - i[1]
-        distance = (dx**2 + dy**2)**.5
+    n = enemies.count
+    pos = enemies.pos[:n]
+    d = numpy.array([player_x, player_y]) - pos[:, :2]
+    distance = numpy.hypot(d[:, 0], d[:, 1])
+    move = distance > 1
+    pos[move, :2] += d[move] / distance[move, None] * (ENEMY_SPEED * TICK)
 
-        if distance > 1:
-            i[0] += (dx / distance) * 0.05
-            i[1] += (dy / distance) * 0.05
-
-        i[3] += i[4]
-        if i[3] >= 1.4 :
-            i[4] = -i[4]
-        elif i[3] <= 0.6:
-            i[4] = -i[4]
+    scale = enemies.scale[:n]
+    dscale = enemies.dscale[:n]
+    scale += dscale * TICK
+    flip = (scale >= 1.4) | (scale <= 0.6)
+    dscale[flip] = -dscale[flip]
 
     if is_game_running==True:
-        for e in enemies:
-            x,y,z = player_x - e[0],player_y - e[1],0-e[2]
-            if abs(x) < 50 and abs(y) < 50 and abs(z)<50:
-                if player_lives > 0:
-                    player_lives -= 1
-                    print(f'Remainig life : {player_lives}')
-                    enemies.remove(e)
-                    enemies.append(spawn_enemy())
-                    if player_lives<=0:
-                        enemies.clear()
-                        is_game_running = False
-                        
-
-                        break
+        touch = (numpy.abs(d[:, 0]) < 50) & (numpy.abs(d[:, 1]) < 50) & (numpy.abs(pos[:, 2]) < 50)
+        for e in numpy.flatnonzero(touch):
+            if player_lives > 0:
+                player_lives -= 1
+                print(f'Remainig life : {player_lives}')
+                respawn_enemy(e)
+                if player_lives<=0:
+                    enemies.clear()
+                    is_game_running = False
+                    
+
+                    break
       
     glutPostRedisplay()
 
@@ -292,7 +583,7 @@ def update_cheat_mode():
     global is_first_person,is_game_running,player_yaw_deg,player_x,player_y,bullets,score,bullet_hit_flag
 
     if is_cheat_mode==True and is_game_running!=False:
-            player_yaw_deg+=0.7
+            player_yaw_deg+=CHEAT_TURN_SPEED * TICK
             player_yaw_deg%= 360
             angle_rad = math.radians(player_yaw_deg)
             x_dir = -math.cos(angle_rad)
@@ -302,62 +593,92 @@ def update_cheat_mode():
             bz = 10
             # bullets.append([bx, by, bz, x_dir, y_dir, 0])
 
-            for j in enemies[:]:
-                distn = ((j[0] - bx)**2 + (j[1] - by)**2)**.5
-                if distn == 0:
-                    continue
-                dt = x_dir * (j[0] - bx) / distn + y_dir * (j[1] - by) / distn
-
-
-                if dt > 0.99 and distn <= 450 :
-                    dx, dy, dz = j[0] - bx, j[1] - by, j[2] - bz
-                    len = (dx**2 + dy**2 + dz**2)**.5
-                    if len == 0:
-                        continue
-
-                    x,y,z = (dx / len, dy / len, dz / len)
-                    temp = [bx, by, bz, x, y, z]
-                    bullets.append(temp)
+            n = enemies.count
+            epos = enemies.pos[:n]
+            enemy_bearings.update(epos, (player_x, player_y))
+
+            #only enemies around the gun's bearing, in list order like the old full scan
+            near = numpy.sort(enemy_bearings.query(math.atan2(y_dir, x_dir), CHEAT_WINDOW))
+            dx = epos[near, 0] - bx
+            dy = epos[near, 1] - by
+            distn = numpy.hypot(dx, dy)
+            ok = distn > 0
+            dt = numpy.zeros(len(near))
+            dt[ok] = (x_dir * dx[ok] + y_dir * dy[ok]) / distn[ok]
+
+            targets = numpy.flatnonzero((dt > 0.99) & (distn <= 450))
+            if len(targets):
+                k = targets[0]
+                j = near[k]
+                dz = epos[j, 2] - bz
+                length = (dx[k]**2 + dy[k]**2 + dz**2)**.5
+                if length != 0:
+                    bullets.add((bx, by, bz), (dx[k] / length, dy[k] / length, dz / length))
 
                     score += 1
                     print(f'Bullet fired')
-                    enemies.remove(j)
-                    
-                    enemies.append(spawn_enemy())
-                    break
+                    respawn_enemy(j)
     glutPostRedisplay()
 
 
-def handle_bullet_enemy_hits():
-    global bullets, score, enemies, player_lives, is_game_running
+#grid cell keys (TILE_SIZE squares) of board positions, with room for the -1/+1 neighbours
+GRID_SIDE = NUM_TILES + 4
+
+def grid_keys(pos):
+    c = numpy.clip((pos[:, :2] + HALF_BOARD) // TILE_SIZE, -1, NUM_TILES + 1).astype(numpy.int64) + 1
+    return c[:, 0] * GRID_SIDE + c[:, 1]
 
-    bulremove = []
-    new = []
-
-    for i in enemies:
-        fired = False
-        for j in bullets:
-            x = j[0] - i[0]
-            y = j[1] - i[1]
-            z = j[2] - i[2]
-
-            if abs(x) < 35 and abs(y) < 35 and abs(z) < 35:
-                fired = True
-                score += 1
-                print('Bullet fired')
-                bulremove.append(j)
-                break
-
-        if fired:
-            new.append(spawn_enemy())
-        else:
-            new.append(i)
 
-    for t in bulremove:
-        if t in bullets:
-            bullets.remove(t)
+def handle_bullet_enemy_hits():
+    global bullets, score, enemies, player_lives, is_game_running
 
-    enemies[:] = new
+    ne, nb = enemies.count, bullets.count
+    if ne == 0 or nb == 0:
+        return
+    epos = enemies.pos[:ne]
+    bpos = bullets.pos[:nb]
+
+    #spatial hash of the bullets (sorted by cell), rebuilt every tick
+    bkeys = grid_keys(bpos)
+    order = numpy.argsort(bkeys, kind="stable")
+    sorted_keys = bkeys[order]
+    ekeys = grid_keys(epos)
+
+    #hit box (35) is smaller than a cell, so the 3x3 cells around an enemy are enough
+    pe, pb = [], []
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            q = ekeys + ox * GRID_SIDE + oy
+            lo = numpy.searchsorted(sorted_keys, q, "left")
+            cnt = numpy.searchsorted(sorted_keys, q, "right") - lo
+            total = int(cnt.sum())
+            if total == 0:
+                continue
+            first = numpy.cumsum(cnt) - cnt
+            pe.append(numpy.repeat(numpy.arange(ne), cnt))
+            pb.append(order[numpy.repeat(lo, cnt) + numpy.arange(total) - numpy.repeat(first, cnt)])
+    if not pe:
+        return
+    pe = numpy.concatenate(pe)
+    pb = numpy.concatenate(pb)
+
+    diff = numpy.abs(bpos[pb] - epos[pe])
+    hit = (diff < 35).all(axis=1)
+    pe, pb = pe[hit], pb[hit]
+    if len(pe) == 0:
+        return
+
+    #each enemy takes the first bullet in the list that hits it, like the old scan
+    fired = numpy.full(ne, nb)
+    numpy.minimum.at(fired, pe, pb)
+    hit_enemies = numpy.flatnonzero(fired < nb)
+
+    for i in hit_enemies:
+        score += 1
+        print('Bullet fired')
+        respawn_enemy(i)
+
+    bullets.remove(fired[hit_enemies].tolist())
 
 #is_game_running controller buttons
 def on_keyboard(key, x, y):
@@ -402,8 +723,7 @@ def on_keyboard(key, x, y):
         bullets.clear()
         enemies.clear()
         for i in range(ENEMY_COUNT):
-            new = spawn_enemy()
-            enemies.append(new)
+            add_enemy()
 
         score = 0
         missed_bullets = 0
@@ -436,7 +756,7 @@ def on_mouse(button, state, x, y):
             bx = player_x + 50 * math.sin(angle_rad) + x_dir * 140
             by = player_y - 50 * math.cos(angle_rad) + y_dir * 140 
             bz = 10
-            bullets.append([bx, by, bz, x_dir, y_dir, 0])
+            bullets.add((bx, by, bz), (x_dir, y_dir, 0))
 
     if button == GLUT_RIGHT_BUTTON and state == GLUT_DOWN :
         if is_game_running:
@@ -446,18 +766,21 @@ def on_mouse(button, state, x, y):
 def setup_camera():
     glMatrixMode(GL_PROJECTION)  
     glLoadIdentity()  
-    gluPerspective(fovY, 1.25, 0.1, 1500) 
+    gluPerspective(fovY, ASPECT, Z_NEAR, Z_FAR) 
     glMatrixMode(GL_MODELVIEW) 
     glLoadIdentity() 
-    global is_first_person, player_x, player_y, player_yaw_deg
+    global is_first_person, player_x, player_y, player_yaw_deg, camera_eye
 
     if is_first_person:
-        n_x = player_x - math.cos(math.radians(player_yaw_deg)) * 25
-        n_y = player_y - math.sin(math.radians(player_yaw_deg)) * 25
+        yaw = math.radians(drawn_yaw_deg())
+        n_x = player_x - math.cos(yaw) * 25
+        n_y = player_y - math.sin(yaw) * 25
         n_z = 40
-        x = player_x - math.cos(math.radians(player_yaw_deg)) * 90
-        y = player_y - math.sin(math.radians(player_yaw_deg)) * 90
+        x = player_x - math.cos(yaw) * 90
+        y = player_y - math.sin(yaw) * 90
         z = 35
+        camera_eye = (n_x, n_y, n_z)
+        center = (x, y, z)
         gluLookAt(n_x, n_y, n_z, 
                   x, y, z, 
                   0, 0, 1)
@@ -467,14 +790,30 @@ def setup_camera():
         x = camera_radius * math.cos(yaw)
         y = camera_radius * math.sin(yaw)
         z = camera_height
+        camera_eye = (x, y, z)
+        center = (0, 0, 0)
         gluLookAt(x, y, z, 0, 0, 0, 0, 0, 1)
+    update_frustum(camera_eye, center, (0, 0, 1), fovY, ASPECT, Z_NEAR, Z_FAR)
 
 
-def idle():
+#one fixed simulation step of TICK seconds
+def tick():
+    global prev_player_yaw_deg
+    enemies.save_prev()
+    bullets.save_prev()
+    prev_player_yaw_deg = player_yaw_deg
     update_enemies()
     handle_bullet_enemy_hits()
     update_bullets()
     update_cheat_mode()
+
+
+def idle():
+    global render_alpha
+    scheduler.wait()
+    for _ in range(scheduler.sim_steps()):
+        tick()
+    render_alpha = scheduler.sim_alpha()
     glutPostRedisplay()
 
 
@@ -486,24 +825,23 @@ def render_frame():
     setup_camera() 
     draw_checkerboard()
     draw_walls()
-    draw_player()
+    if spheres_visible(numpy.array([[player_x, player_y, 0.0]]), 200)[0]: #whole model, lying down included
+        draw_player()
     draw_bullets()
 
-    for i in enemies:
-        draw_enemy(i)
+    epos = enemies.lerp_pos(render_alpha)
+    escale = enemies.lerp_scale(render_alpha)
+    n = enemies.count
+    elod = lod_levels(enemies.lod[:n], camera_distance(epos[:, 0], epos[:, 1], 40 * escale))
+    enemies.lod[:n] = elod
+    #body (r 40 at z 40) and head (r 19 at z 85), scaled: sphere of 65 around z 50
+    centers = numpy.column_stack((epos[:, 0], epos[:, 1], 50 * escale))
+    for i in numpy.flatnonzero(spheres_visible(centers, 65 * escale)):
+        draw_enemy(epos[i, 0], epos[i, 1], escale[i], elod[i])
    
-    if is_game_running:
-        draw_text(10, 790, f"Player Life Remainig: {player_lives}",GLUT_BITMAP_TIMES_ROMAN_24)
-        draw_text(10, 760, f"Game Score  : {score} ",GLUT_BITMAP_TIMES_ROMAN_24)
-        if is_cheat_mode:
-            draw_text(10, 730, f"Player Bullet Missed : {0} ",GLUT_BITMAP_TIMES_ROMAN_24)
-        else:
-            draw_text(10, 730, f"Player Bullet Missed : {missed_bullets} ",GLUT_BITMAP_TIMES_ROMAN_24)
-
-
-    else:
-        draw_text(10, 790, f"Game is Over. Score is {score}.",GLUT_BITMAP_TIMES_ROMAN_24)
-        draw_text(10, 760, f'Press <R> to RESTART',GLUT_BITMAP_TIMES_ROMAN_24)
+    #the text is only redrawn when one of the values it shows changes
+    hud_key = (is_game_running, player_lives, score, is_cheat_mode, missed_bullets)
+    hud_layer.draw(hud_key, draw_hud, 1000, 800)
 
     glutSwapBuffers()
 
@@ -513,6 +851,7 @@ def main():
     glutInitWindowSize(1050, 850)  
     glutInitWindowPosition(0, 0)  
     wind = glutCreateWindow(b"-PUBG-")  
+    build_meshes()
 
     glutDisplayFunc(render_frame)  
     glutKeyboardFunc(on_keyboard)  
@@ -5,6 +5,8 @@ from OpenGL.GLU import *
 from math import sin, cos, pi
 import random
 import time
+from frame_scheduler import FrameScheduler
+from bitmap_text import HudLayer, draw_string, hud, text_width
 
 
 # ---------- Game States (Menu System) ----------
@@ -26,6 +28,9 @@ NOVA_MAX_CHARGES = 2
 # Clears nearby real obstacles when activated.
 # (No cooldown required; rarity is via spawn distance.)
 
+# ---------- Frame pacing ----------
+TARGET_FPS = 60
+
 class Box:
     def __init__(self, x, y, z, w, h, d):
         self.x = x
@@ -77,6 +82,8 @@ class Game:
         # Each item: {x,y,z, age, dur, r0, r1}
         self.explosions = []
 
+        # HUD text kept in a texture, redrawn only when what it shows changes
+        self.hud_layer = HudLayer()
 
 
         # ---------- Shield state ----------
@@ -145,6 +152,7 @@ class Game:
         self.obstacles = []
 
         self.last = None
+        self.scheduler = FrameScheduler(TARGET_FPS, name="Driving Game")
 
 
         self.front = 100.0
@@ -317,33 +325,79 @@ class Game:
         return Box(p["x"], p["y"], p["z"], s, s, s)
 
 
+    # window pixel coordinates; call inside hud(self.w, self.h)
     def text(self, x, y, s, font=GLUT_BITMAP_HELVETICA_18, r=1.0, g=1.0, b=1.0):
         glColor3f(r, g, b)
-        glMatrixMode(GL_PROJECTION)
-        glPushMatrix()
-        glLoadIdentity()
-        gluOrtho2D(0, self.w, 0, self.h)
+        draw_string(x, y, s, font)
 
-        glMatrixMode(GL_MODELVIEW)
-        glPushMatrix()
-        glLoadIdentity()
 
-        glRasterPos2f(x, y)
-        for ch in s:
-            glutBitmapCharacter(font, ord(ch))
 
-        glPopMatrix()
-        glMatrixMode(GL_PROJECTION)
-        glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
+    def text_width(self, text, font=GLUT_BITMAP_HELVETICA_18):
+        return text_width(text, font)
+
+    # gameplay HUD lines, painted into self.hud_layer
+    def hud_text(self):
+        self.text(20, self.h - 30, f"Score: {self.score}", r=1.0, g=1.0, b=0.0)
+        self.text(20, 30, f"Lives: {self.life}", r=1.0, g=1.0, b=1.0)
+        # Shield HUD
+        if self.shield_on:
+            self.text(20, 70, f"Shield: ON ({self.shield_t:.1f}s)", r=0.2, g=0.9, b=1.0, font=GLUT_BITMAP_9_BY_15)
+        else:
+            cd_txt = f"{self.shield_cd:.1f}s" if self.shield_cd > 0.0 else "Ready"
+            self.text(20, 70, f"Shield Charges: {self.shield_charges} | Cooldown: {cd_txt}", r=0.2, g=0.9, b=1.0, font=GLUT_BITMAP_9_BY_15)
+        # Nova HUD
+        self.text(20, 55, f"Nova Charges: {self.nova_charges} (F to use)", r=0.85, g=0.45, b=1.0, font=GLUT_BITMAP_9_BY_15)
 
+        self.text(20, self.h - 50, f"Level: {self.level + 1}", r=0.8, g=0.8, b=1.0)
+        self.text(20, self.h - 70, f"Speed x{int(self.base)}", r=0.8, g=1.0, b=0.8)
+        self.text(20, self.h - 90, f"Obstacles x{int(2 ** self.level)}", r=0.8, g=1.0, b=0.8)
 
+        if self.msgt > 0:
+            self.text(20, self.h - 110, self.msg, r=1.0, g=0.2, b=0.2)
 
-    def text_width(self, text, font=GLUT_BITMAP_HELVETICA_18):
-        width = 0
-        for ch in text:
-            width += glutBitmapWidth(font, ord(ch))
-        return width
+        if self.pause:
+            self.text(self.w / 2 - 40, self.h / 2, "PAUSED", r=1.0, g=1.0, b=1.0)
+            self.text(self.w / 2 - 120, self.h / 2 - 20, "Left-Click or 'P' to Resume", r=0.8, g=0.8, b=0.8)
+
+    # menu / controls / game over lines, painted into self.hud_layer
+    def overlay_text(self):
+        title_y = self.h - 120
+        if self.state == GAME_MENU:
+            lines = [
+                ("3D DRIVING GAME", (1.0, 1.0, 0.2), GLUT_BITMAP_HELVETICA_18),
+                ("G : Start Game", (1.0, 1.0, 1.0), GLUT_BITMAP_HELVETICA_18),
+                ("Z : Controls", (0.9, 0.9, 0.9), GLUT_BITMAP_HELVETICA_18),
+                ("Q / ESC : Quit", (0.9, 0.9, 0.9), GLUT_BITMAP_HELVETICA_18),
+                ("Background is live (menu overlay)", (0.7, 0.9, 0.7), GLUT_BITMAP_9_BY_15),
+            ]
+            y = title_y
+            for i, (line, col, font) in enumerate(lines):
+                x = self.w//2 - self.text_width(line, font)//2
+                r, g, b = col
+                self.text(x, y - i*30, line, r=r, g=g, b=b, font=font)
+        elif self.state == GAME_CONTROLS:
+            self.text(self.w/2 - 90, title_y, "CONTROLS", r=1.0, g=1.0, b=0.2)
+            y = title_y - 45
+            lh = 22
+            lines = [
+                "Arrow Left/Right : Move car",
+                "W                : Toggle boost",
+                "P or Left Click  : Pause / Resume",
+                "V                : Change camera view",
+                "E                : Activate Shield (if charged)",
+                "F                : Activate NOVA (all on-screen)",
+                "Up/Down (View 2) : Camera height",
+                "Right Click      : Restart after Game Over",
+                "B                : Back to Menu",
+            ]
+            for line in lines:
+                self.text(self.w/2 - 220, y, line, r=1.0, g=1.0, b=1.0)
+                y -= lh
+        elif self.state == GAME_OVER:
+            self.text(self.w/2 - 70, title_y, "GAME OVER", r=1.0, g=0.2, b=0.2)
+            self.text(self.w/2 - 110, title_y - 40, f"Final Score: {self.score}", r=1.0, g=1.0, b=1.0)
+            self.text(self.w/2 - 220, title_y - 75, "Right Click : Restart", r=0.9, g=0.9, b=0.9)
+            self.text(self.w/2 - 220, title_y - 100, "B : Back to Menu", r=0.9, g=0.9, b=0.9)
 
     def camera(self):
         glMatrixMode(GL_PROJECTION)
@@ -708,97 +762,38 @@ class Game:
                 glPopMatrix()
                 glDisable(GL_BLEND)
 
-            self.text(20, self.h - 30, f"Score: {self.score}", r=1.0, g=1.0, b=0.0)
-            self.text(20, 30, f"Lives: {self.life}", r=1.0, g=1.0, b=1.0)
-            # Shield HUD
-            if self.shield_on:
-                self.text(20, 70, f"Shield: ON ({self.shield_t:.1f}s)", r=0.2, g=0.9, b=1.0, font=GLUT_BITMAP_9_BY_15)
-            else:
-                cd_txt = f"{self.shield_cd:.1f}s" if self.shield_cd > 0.0 else "Ready"
-                self.text(20, 70, f"Shield Charges: {self.shield_charges} | Cooldown: {cd_txt}", r=0.2, g=0.9, b=1.0, font=GLUT_BITMAP_9_BY_15)
-            # Nova HUD
-            self.text(20, 55, f"Nova Charges: {self.nova_charges} (F to use)", r=0.85, g=0.45, b=1.0, font=GLUT_BITMAP_9_BY_15)
-
-            self.text(20, self.h - 50, f"Level: {self.level + 1}", r=0.8, g=0.8, b=1.0)
-            self.text(20, self.h - 70, f"Speed x{int(self.base)}", r=0.8, g=1.0, b=0.8)
-            self.text(20, self.h - 90, f"Obstacles x{int(2 ** self.level)}", r=0.8, g=1.0, b=0.8)
-
-            if self.msgt > 0:
-                self.text(20, self.h - 110, self.msg, r=1.0, g=0.2, b=0.2)
-
-            if self.pause:
-                self.text(self.w / 2 - 40, self.h / 2, "PAUSED", r=1.0, g=1.0, b=1.0)
-                self.text(self.w / 2 - 120, self.h / 2 - 20, "Left-Click or 'P' to Resume", r=0.8, g=0.8, b=0.8)
+            # HUD text is only redrawn when a value it shows changes
+            key = (self.state, self.score, self.life, self.shield_on,
+                   round(self.shield_t, 1) if self.shield_on else None,
+                   self.shield_charges, round(self.shield_cd, 1) if self.shield_cd > 0.0 else None,
+                   self.nova_charges, self.level, int(self.base),
+                   self.msg if self.msgt > 0 else None, self.pause)
+            self.hud_layer.draw(key, self.hud_text, self.w, self.h)
 
         else:
             # --------- MENU / CONTROLS / GAME OVER OVERLAY ---------
-            glMatrixMode(GL_PROJECTION)
-            glPushMatrix()
-            glLoadIdentity()
-            gluOrtho2D(0, self.w, 0, self.h)
-            glMatrixMode(GL_MODELVIEW)
-            glPushMatrix()
-            glLoadIdentity()
-            glDisable(GL_DEPTH_TEST)
-            was_lighting = glIsEnabled(GL_LIGHTING)
-            if was_lighting:
-                glDisable(GL_LIGHTING)
-            glEnable(GL_BLEND)
-            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-            glColor4f(0.0, 0.0, 0.0, 0.55)
-            glBegin(GL_QUADS)
-            glVertex2f(0, 0)
-            glVertex2f(self.w, 0)
-            glVertex2f(self.w, self.h)
-            glVertex2f(0, self.h)
-            glEnd()
-            glDisable(GL_BLEND)
-
-            title_y = self.h - 120
-            if self.state == GAME_MENU:
-                lines = [
-                    ("3D DRIVING GAME", (1.0, 1.0, 0.2), GLUT_BITMAP_HELVETICA_18),
-                    ("G : Start Game", (1.0, 1.0, 1.0), GLUT_BITMAP_HELVETICA_18),
-                    ("Z : Controls", (0.9, 0.9, 0.9), GLUT_BITMAP_HELVETICA_18),
-                    ("Q / ESC : Quit", (0.9, 0.9, 0.9), GLUT_BITMAP_HELVETICA_18),
-                    ("Background is live (menu overlay)", (0.7, 0.9, 0.7), GLUT_BITMAP_9_BY_15),
-                ]
-                y = title_y
-                for i, (line, col, font) in enumerate(lines):
-                    x = self.w//2 - self.text_width(line, font)//2
-                    r, g, b = col
-                    self.text(x, y - i*30, line, r=r, g=g, b=b, font=font)
-            elif self.state == GAME_CONTROLS:
-                self.text(self.w/2 - 90, title_y, "CONTROLS", r=1.0, g=1.0, b=0.2)
-                y = title_y - 45
-                lh = 22
-                lines = [
-                    "Arrow Left/Right : Move car",
-                    "W                : Toggle boost",
-                    "P or Left Click  : Pause / Resume",
-                    "V                : Change camera view",
-                    "E                : Activate Shield (if charged)",
-                    "F                : Activate NOVA (all on-screen)",
-                    "Up/Down (View 2) : Camera height",
-                    "Right Click      : Restart after Game Over",
-                    "B                : Back to Menu",
-                ]
-                for line in lines:
-                    self.text(self.w/2 - 220, y, line, r=1.0, g=1.0, b=1.0)
-                    y -= lh
-            elif self.state == GAME_OVER:
-                self.text(self.w/2 - 70, title_y, "GAME OVER", r=1.0, g=0.2, b=0.2)
-                self.text(self.w/2 - 110, title_y - 40, f"Final Score: {self.score}", r=1.0, g=1.0, b=1.0)
-                self.text(self.w/2 - 220, title_y - 75, "Right Click : Restart", r=0.9, g=0.9, b=0.9)
-                self.text(self.w/2 - 220, title_y - 100, "B : Back to Menu", r=0.9, g=0.9, b=0.9)
+            with hud(self.w, self.h):
+                glDisable(GL_DEPTH_TEST)
+                was_lighting = glIsEnabled(GL_LIGHTING)
+                if was_lighting:
+                    glDisable(GL_LIGHTING)
+                glEnable(GL_BLEND)
+                glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+                glColor4f(0.0, 0.0, 0.0, 0.55)
+                glBegin(GL_QUADS)
+                glVertex2f(0, 0)
+                glVertex2f(self.w, 0)
+                glVertex2f(self.w, self.h)
+                glVertex2f(0, self.h)
+                glEnd()
+                glDisable(GL_BLEND)
+
+            # outside hud(): HudLayer pushes its own projection, GL only promises a stack of 2
+            self.hud_layer.draw((self.state, self.score), self.overlay_text, self.w, self.h)
 
             if was_lighting:
                 glEnable(GL_LIGHTING)
             glEnable(GL_DEPTH_TEST)
-            glPopMatrix()
-            glMatrixMode(GL_PROJECTION)
-            glPopMatrix()
-            glMatrixMode(GL_MODELVIEW)
         glutSwapBuffers()
 
 
@@ -1114,6 +1109,7 @@ class Game:
 
 
     def idle(self):
+        self.scheduler.wait()
         now = time.perf_counter()
         if self.last is None:
             self.last = now
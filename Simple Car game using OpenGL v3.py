@@ -7,6 +7,8 @@ from math import sin, cos, pi, radians
 import random
 import sys
 import copy
+from frame_scheduler import FrameScheduler
+from bitmap_text import draw_glyphs
 
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 700
@@ -25,8 +27,8 @@ SPEED_STEP = 0.15
 
 
 TARGET_FPS = 60
-FRAME_TIME = 1.0 / TARGET_FPS
 last_time = 0.0
+scheduler = FrameScheduler(TARGET_FPS, name="Driving Game")
 
 VIEW_FIRST_PERSON = 0
 VIEW_THIRD_PERSON_ORBIT = 1
@@ -180,8 +182,7 @@ def render_text(x, y, z, text, r=1.0, g=1.0, b=1.0, font=GLUT_BITMAP_HELVETICA_1
         glRasterPos3f(x, y, z)
     else:
         glWindowPos2f(x, y)
-    for char in text:
-        glutBitmapCharacter(font, ord(char))
+    draw_glyphs(text, font)
 
 def get_car_aabb():
     car_center_y = 0.6
@@ -466,7 +467,6 @@ def animation(value):
         if collision_message_timer == 0:
              collision_message = ""
     if game_paused or game_over:
-        glutTimerFunc(16, animation, 0)
         glutPostRedisplay()
         return
     # ----- Difficulty & Level Progression -----
@@ -494,8 +494,6 @@ def animation(value):
 
     now = time.time()
     dt = now - last_time
-    if dt < FRAME_TIME:
-        return
     last_time = now
 
     current_speed_mult = base_speed_multiplier + acceleration_boost
@@ -655,7 +653,11 @@ def animation(value):
     )
 
     glutPostRedisplay()
-    glutTimerFunc(16, animation, 0)
+
+
+def idle():
+    scheduler.wait()
+    animation(0)
 
 def keyboard_action(key, x, y):
     global game_paused, currentViewMode, cheat_mode
@@ -814,7 +816,7 @@ def main():
     glutKeyboardUpFunc(keyboard_up_action)
     glutSpecialFunc(special_key_action)
     glutMouseFunc(mouse_action)
-    glutIdleFunc(lambda: animation(0))
+    glutIdleFunc(idle)
     print("\n================ GAME CONTROLS ================")
     print("Steering:")
     print("  ← / →        : Move car left / right")
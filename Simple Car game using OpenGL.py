@@ -5,6 +5,8 @@ from OpenGL.GLU import *
 from math import sin, cos, pi
 import random
 import time
+from frame_scheduler import FrameScheduler
+from bitmap_text import draw_string, hud
 
 
 # ---------- Game States (Menu System) ----------
@@ -26,6 +28,9 @@ NOVA_MAX_CHARGES = 2
 # Clears nearby real obstacles when activated.
 # (No cooldown required; rarity is via spawn distance.)
 
+# ---------- Frame pacing ----------
+TARGET_FPS = 60
+
 class Box:
     def __init__(self, x, y, z, w, h, d):
         self.x = x
@@ -145,6 +150,7 @@ class Game:
         self.obstacles = []
 
         self.last = None
+        self.scheduler = FrameScheduler(TARGET_FPS, name="Driving Game")
 
 
         self.front = 100.0
@@ -311,25 +317,10 @@ class Game:
         return Box(p["x"], p["y"], p["z"], s, s, s)
 
 
+    # window pixel coordinates; call inside hud(self.w, self.h)
     def text(self, x, y, s, font=GLUT_BITMAP_HELVETICA_18, r=1.0, g=1.0, b=1.0):
         glColor3f(r, g, b)
-        glMatrixMode(GL_PROJECTION)
-        glPushMatrix()
-        glLoadIdentity()
-        gluOrtho2D(0, self.w, 0, self.h)
-
-        glMatrixMode(GL_MODELVIEW)
-        glPushMatrix()
-        glLoadIdentity()
-
-        glRasterPos2f(x, y)
-        for ch in s:
-            glutBitmapCharacter(font, ord(ch))
-
-        glPopMatrix()
-        glMatrixMode(GL_PROJECTION)
-        glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
+        draw_string(x, y, s, font)
 
 
     def camera(self):
@@ -639,47 +630,37 @@ class Game:
         # --------- MENU / CONTROLS / OVER SCREENS ---------
         if self.state != GAME_PLAYING:
             # 2D-only screen
-            glMatrixMode(GL_PROJECTION)
-            glPushMatrix()
-            glLoadIdentity()
-            gluOrtho2D(0, self.w, 0, self.h)
-            glMatrixMode(GL_MODELVIEW)
-            glPushMatrix()
-            glLoadIdentity()
-            title_y = self.h - 120
-            if self.state == GAME_MENU:
-                self.text(self.w/2 - 110, title_y, "3D DRIVING GAME", r=1.0, g=1.0, b=0.2)
-                self.text(self.w/2 - 170, title_y - 40, "G : Start Game", r=1.0, g=1.0, b=1.0)
-                self.text(self.w/2 - 170, title_y - 65, "Z : Controls", r=0.9, g=0.9, b=0.9)
-                self.text(self.w/2 - 170, title_y - 90, "Q / ESC : Quit", r=0.9, g=0.9, b=0.9)
-                self.text(self.w/2 - 260, title_y - 130, "Tip: Press W to toggle boost during gameplay", r=0.7, g=0.9, b=0.7)
-            elif self.state == GAME_CONTROLS:
-                self.text(self.w/2 - 90, title_y, "CONTROLS", r=1.0, g=1.0, b=0.2)
-                y = title_y - 45
-                lh = 22
-                lines = [
-                    "Arrow Left/Right : Move car",
-                    "W                : Toggle boost",
-                    "P or Left Click  : Pause / Resume",
-                    "V                : Change camera view",
-                    "E                : Activate Shield (if charged)",
-                    "F                : Activate NOVA (clear obstacles)",
-                    "Up/Down (View 2) : Camera height",
-                    "Right Click      : Restart after Game Over",
-                    "B                : Back to Menu",
-                ]
-                for line in lines:
-                    self.text(self.w/2 - 220, y, line, r=1.0, g=1.0, b=1.0)
-                    y -= lh
-            elif self.state == GAME_OVER:
-                self.text(self.w/2 - 70, title_y, "GAME OVER", r=1.0, g=0.2, b=0.2)
-                self.text(self.w/2 - 110, title_y - 40, f"Final Score: {self.score}", r=1.0, g=1.0, b=1.0)
-                self.text(self.w/2 - 200, title_y - 75, "Right Click : Restart", r=0.9, g=0.9, b=0.9)
-                self.text(self.w/2 - 200, title_y - 100, "B : Back to Menu", r=0.9, g=0.9, b=0.9)
-            glPopMatrix()
-            glMatrixMode(GL_PROJECTION)
-            glPopMatrix()
-            glMatrixMode(GL_MODELVIEW)
+            with hud(self.w, self.h):
+                title_y = self.h - 120
+                if self.state == GAME_MENU:
+                    self.text(self.w/2 - 110, title_y, "3D DRIVING GAME", r=1.0, g=1.0, b=0.2)
+                    self.text(self.w/2 - 170, title_y - 40, "G : Start Game", r=1.0, g=1.0, b=1.0)
+                    self.text(self.w/2 - 170, title_y - 65, "Z : Controls", r=0.9, g=0.9, b=0.9)
+                    self.text(self.w/2 - 170, title_y - 90, "Q / ESC : Quit", r=0.9, g=0.9, b=0.9)
+                    self.text(self.w/2 - 260, title_y - 130, "Tip: Press W to toggle boost during gameplay", r=0.7, g=0.9, b=0.7)
+                elif self.state == GAME_CONTROLS:
+                    self.text(self.w/2 - 90, title_y, "CONTROLS", r=1.0, g=1.0, b=0.2)
+                    y = title_y - 45
+                    lh = 22
+                    lines = [
+                        "Arrow Left/Right : Move car",
+                        "W                : Toggle boost",
+                        "P or Left Click  : Pause / Resume",
+                        "V                : Change camera view",
+                        "E                : Activate Shield (if charged)",
+                        "F                : Activate NOVA (clear obstacles)",
+                        "Up/Down (View 2) : Camera height",
+                        "Right Click      : Restart after Game Over",
+                        "B                : Back to Menu",
+                    ]
+                    for line in lines:
+                        self.text(self.w/2 - 220, y, line, r=1.0, g=1.0, b=1.0)
+                        y -= lh
+                elif self.state == GAME_OVER:
+                    self.text(self.w/2 - 70, title_y, "GAME OVER", r=1.0, g=0.2, b=0.2)
+                    self.text(self.w/2 - 110, title_y - 40, f"Final Score: {self.score}", r=1.0, g=1.0, b=1.0)
+                    self.text(self.w/2 - 200, title_y - 75, "Right Click : Restart", r=0.9, g=0.9, b=0.9)
+                    self.text(self.w/2 - 200, title_y - 100, "B : Back to Menu", r=0.9, g=0.9, b=0.9)
             glutSwapBuffers()
             return
         
@@ -726,27 +707,28 @@ class Game:
         self.draw_explosions()
 
         self.car()
-        self.text(20, self.h - 30, f"Score: {self.score}", r=1.0, g=1.0, b=0.0)
-        self.text(20, 30, f"Lives: {self.life}", r=1.0, g=1.0, b=1.0)
-        # Shield HUD
-        if self.shield_on:
-            self.text(20, 70, f"Shield: ON ({self.shield_t:.1f}s)", r=0.2, g=0.9, b=1.0, font=GLUT_BITMAP_9_BY_15)
-        else:
-            cd_txt = f"{self.shield_cd:.1f}s" if self.shield_cd > 0.0 else "Ready"
-            self.text(20, 70, f"Shield Charges: {self.shield_charges} | Cooldown: {cd_txt}", r=0.2, g=0.9, b=1.0, font=GLUT_BITMAP_9_BY_15)
-        # Nova HUD
-        self.text(20, 55, f"Nova Charges: {self.nova_charges} (F to use)", r=0.85, g=0.45, b=1.0, font=GLUT_BITMAP_9_BY_15)
+        with hud(self.w, self.h):
+            self.text(20, self.h - 30, f"Score: {self.score}", r=1.0, g=1.0, b=0.0)
+            self.text(20, 30, f"Lives: {self.life}", r=1.0, g=1.0, b=1.0)
+            # Shield HUD
+            if self.shield_on:
+                self.text(20, 70, f"Shield: ON ({self.shield_t:.1f}s)", r=0.2, g=0.9, b=1.0, font=GLUT_BITMAP_9_BY_15)
+            else:
+                cd_txt = f"{self.shield_cd:.1f}s" if self.shield_cd > 0.0 else "Ready"
+                self.text(20, 70, f"Shield Charges: {self.shield_charges} | Cooldown: {cd_txt}", r=0.2, g=0.9, b=1.0, font=GLUT_BITMAP_9_BY_15)
+            # Nova HUD
+            self.text(20, 55, f"Nova Charges: {self.nova_charges} (F to use)", r=0.85, g=0.45, b=1.0, font=GLUT_BITMAP_9_BY_15)
 
-        self.text(20, self.h - 50, f"Level: {self.level + 1}", r=0.8, g=0.8, b=1.0)
-        self.text(20, self.h - 70, f"Speed x{int(self.base)}", r=0.8, g=1.0, b=0.8)
-        self.text(20, self.h - 90, f"Obstacles x{int(2 ** self.level)}", r=0.8, g=1.0, b=0.8)
+            self.text(20, self.h - 50, f"Level: {self.level + 1}", r=0.8, g=0.8, b=1.0)
+            self.text(20, self.h - 70, f"Speed x{int(self.base)}", r=0.8, g=1.0, b=0.8)
+            self.text(20, self.h - 90, f"Obstacles x{int(2 ** self.level)}", r=0.8, g=1.0, b=0.8)
 
-        if self.msgt > 0:
-            self.text(20, self.h - 110, self.msg, r=1.0, g=0.2, b=0.2)
+            if self.msgt > 0:
+                self.text(20, self.h - 110, self.msg, r=1.0, g=0.2, b=0.2)
 
-        if self.pause:
-            self.text(self.w / 2 - 40, self.h / 2, "PAUSED", r=1.0, g=1.0, b=1.0)
-            self.text(self.w / 2 - 120, self.h / 2 - 20, "Left-Click or 'P' to Resume", r=0.8, g=0.8, b=0.8)
+            if self.pause:
+                self.text(self.w / 2 - 40, self.h / 2, "PAUSED", r=1.0, g=1.0, b=1.0)
+                self.text(self.w / 2 - 120, self.h / 2 - 20, "Left-Click or 'P' to Resume", r=0.8, g=0.8, b=0.8)
 
         glutSwapBuffers()
 
@@ -939,6 +921,7 @@ class Game:
 
 
     def idle(self):
+        self.scheduler.wait()
         now = time.perf_counter()
         if self.last is None:
             self.last = now
@@ -2,121 +2,210 @@ from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
 import random
+import sys
 import time
+import os
+import struct
+import zlib
+import numpy
+from functools import lru_cache
+from frame_scheduler import FrameScheduler
 
 # variables
 W_Width, W_Height = 500, 700                        # window size
-score = 0                                           # score
-diamond_x = random.randint(-235, 235)               # diamond x vals for random pos
-down = 50                                           # diamond y vals for animate
-n_x = 0                                             # catcher x vals to move
-speed1 = 1                                          # diamond speed (vertical)
 max_speed = 12                                      # adjust difficulty here
-speed2 = 15                                         # catcher speed (horizontal)
-r_d, g_d, b_d = random.uniform(0.1, 1), random.uniform(0.1, 1), random.uniform(0.1, 1)
+TICK = 1 / 144                                      # fixed simulation step, speeds below are per tick
+MAX_FRAME_TIME = 0.25                               # longest real frame the simulation catches up on
+COLUMN_W = 20                                       # bucket width for rain mode catch detection
+TARGET_FPS = 60                                     # redraw rate, the simulation still runs at 1 / TICK
 last = time.time()
 
 # flags
-pause = False       # pause?
 end = False         # cross button exit
 new_game = False    # arrow button new start
-c_c = False         # checked collision of diamond and catcher yet?
-game = True         # game running?
-cheat = False       # cheat mode on or off?
+
+# rasterized point arrays queued this frame, grouped by (r, g, b, point size) and drawn in flush_points()
+cached_batches = {}
+# point arrays with one color per point, grouped by point size
+colored_batches = {}
 
 
 # for drawing line using Midpoint algorithm
-def zone_change(point, zone1, zone2):
-    x, y = point
-    if zone1 == 0:
-        current_zone = zone2
-        if current_zone == 0:
-            return (x, y)
-        elif current_zone == 1:
-            return (y, x)
-        elif current_zone == 2:
-            return (-y, x)
-        elif current_zone == 3:
-            return (-x, y)
-        elif current_zone == 4:
-            return (-x, -y)
-        elif current_zone == 5:
-            return (-y, -x)
-        elif current_zone == 6:
-            return (y, -x)
-        elif current_zone == 7:
-            return (x, -y)
-    else:
-        current_zone = zone1
-        if current_zone == 0:
-            return (x, y)
-        elif current_zone == 1:
-            return (y, x)
-        elif current_zone == 2:
-            return (y, -x)
-        elif current_zone == 3:
-            return (-x, y)
-        elif current_zone == 4:
-            return (-x, -y)
-        elif current_zone == 5:
-            return (-y, -x)
-        elif current_zone == 6:
-            return (-y, x)
-        elif current_zone == 7:
-            return (x, -y)
-
-
-def detect_zone(x0, y0, x1, y1):
-    dx = x1 - x0
-    dy = y1 - y0
-    if abs(dx) <= abs(dy):
-        if dx > 0:
-            if dy <= 0:
-                return 6
-            else:
-                return 1
-        else:
-            if dy <= 0:
-                return 5
-            else:
-                return 2
-    else:
-        if dx <= 0:
-            if dy > 0:
-                return 3
-            else:
-                return 4
-        else:
-            if dy > 0:
-                return 0
-            else:
-                return 7
+# the eight zone transforms as lookup tables: swap x/y first, then flip signs
+# to zone 0
+ZONE_SWAP = numpy.array([False, True, True, False, False, True, True, False])
+TO_ZONE0_SX = numpy.array([1, 1, 1, -1, -1, -1, -1, 1])
+TO_ZONE0_SY = numpy.array([1, 1, -1, 1, -1, -1, 1, -1])
+# back from zone 0
+FROM_ZONE0_SX = numpy.array([1, 1, -1, -1, -1, -1, 1, 1])
+FROM_ZONE0_SY = numpy.array([1, 1, 1, 1, -1, -1, -1, -1])
 
 
-def middle_point(x0, y0, x1, y1, r, g, b, p=3):
-    glColor3f(r, g, b)
-    glPointSize(p)
-    zone = detect_zone(x0, y0, x1, y1)
-    x0, y0 = zone_change((x0, y0), zone, 0)
-    x1, y1 = zone_change((x1, y1), zone, 0)
+def detect_zones(x0, y0, x1, y1):
     dx = x1 - x0
     dy = y1 - y0
-    x, y = x0, y0
-    NE = 2 * dy - 2 * dx
-    E = 2 * dy
-    D = 2 * dy - dx
-
-    while x <= x1:
-        pnt_x, pnt_y = zone_change((x, y), 0, zone)
-        glBegin(GL_POINTS)
-        glVertex2f(pnt_x, pnt_y)
-        glEnd()
-        x += 1
-        if D > 0:
-            D += NE
-            y += 1
+    steep = numpy.abs(dx) <= numpy.abs(dy)
+    return numpy.where(steep,
+                       numpy.where(dx > 0, numpy.where(dy <= 0, 6, 1), numpy.where(dy <= 0, 5, 2)),
+                       numpy.where(dx <= 0, numpy.where(dy > 0, 3, 4), numpy.where(dy > 0, 0, 7)))
+
+
+# midpoint algorithm for many segments at once, segs is an (n, 4) array of x0, y0, x1, y1
+# the y step after k pixels has the closed form ceil((2*dy*k - dx) / (2*dx)), so no per-pixel loop
+def rasterize_segments(segs):
+    segs = numpy.asarray(segs, dtype=numpy.float64).reshape(-1, 4)
+    if len(segs) == 0:
+        return numpy.empty((0, 2), dtype=numpy.float64)
+    x0, y0, x1, y1 = segs.T
+    zone = detect_zones(x0, y0, x1, y1)
+    swap = ZONE_SWAP[zone]
+
+    # endpoints in zone 0
+    a0 = numpy.where(swap, y0, x0) * TO_ZONE0_SX[zone]
+    b0 = numpy.where(swap, x0, y0) * TO_ZONE0_SY[zone]
+    a1 = numpy.where(swap, y1, x1) * TO_ZONE0_SX[zone]
+    b1 = numpy.where(swap, x1, y1) * TO_ZONE0_SY[zone]
+    dx = a1 - a0
+    dy = b1 - b0
+
+    count = (numpy.floor(dx) + 1).astype(numpy.int64)
+    seg = numpy.repeat(numpy.arange(len(segs)), count)
+    start = numpy.cumsum(count) - count
+    k = numpy.arange(len(seg)) - start[seg]
+
+    sdx = dx[seg]
+    sdy = dy[seg]
+    safe_dx = numpy.where(sdx > 0, sdx, 1)
+    steps = numpy.where(sdx > 0, numpy.ceil((2 * sdy * k - sdx) / (2 * safe_dx)), 0)
+
+    x = a0[seg] + k
+    y = b0[seg] + steps
+
+    # back to the segment's own zone
+    zs = zone[seg]
+    sw = swap[seg]
+    out = numpy.empty((len(seg), 2), dtype=numpy.float64)
+    out[:, 0] = numpy.where(sw, y, x) * FROM_ZONE0_SX[zs]
+    out[:, 1] = numpy.where(sw, x, y) * FROM_ZONE0_SY[zs]
+    return out
+
+
+# rasterized segments by endpoints and point size, least recently used ones are dropped
+@lru_cache(maxsize=256)
+def segment_points(x0, y0, x1, y1, p):
+    pts = rasterize_segments([(x0, y0, x1, y1)])
+    pts.flags.writeable = False
+    return pts
+
+
+# queues a midpoint line, reusing the cached pixels shifted by (ox, oy) for moving shapes
+def middle_point_cached(x0, y0, x1, y1, r, g, b, p=3, ox=0, oy=0):
+    pts = segment_points(x0, y0, x1, y1, p)
+    if ox or oy:
+        pts = pts + (ox, oy)
+    cached_batches.setdefault((r, g, b, p), []).append(pts)
+
+
+# same shape drawn at many offsets, one color per copy
+def middle_point_instances(segs, offsets, colors, p=3):
+    if len(offsets) == 0:
+        return
+    shape = numpy.concatenate([segment_points(*seg, p) for seg in segs])
+    pts = (shape[None, :, :] + numpy.asarray(offsets)[:, None, :]).reshape(-1, 2)
+    cols = numpy.repeat(numpy.asarray(colors), len(shape), axis=0)
+    colored_batches.setdefault(p, []).append((pts, cols))
+
+
+# everything queued this frame as (points, color, point size), color is (r, g, b) or one row per point
+def take_batches():
+    batches = []
+    for key, parts in cached_batches.items():
+        batches.append((numpy.concatenate(parts), key[:3], key[3]))
+    for p, parts in colored_batches.items():
+        batches.append((numpy.concatenate([pt for pt, _ in parts]),
+                        numpy.concatenate([c for _, c in parts]), p))
+    cached_batches.clear()
+    colored_batches.clear()
+    return batches
+
+
+# one vertex array draw per color / point size instead of a glBegin/glEnd per pixel
+def flush_points():
+    glEnableClientState(GL_VERTEX_ARRAY)
+    for pts, color, p in take_batches():
+        glPointSize(p)
+        glVertexPointer(2, GL_FLOAT, 0, pts.astype(numpy.float32))
+        if numpy.ndim(color) == 2:
+            glEnableClientState(GL_COLOR_ARRAY)
+            glColorPointer(3, GL_FLOAT, 0, numpy.asarray(color, dtype=numpy.float32))
+            glDrawArrays(GL_POINTS, 0, len(pts))
+            glDisableClientState(GL_COLOR_ARRAY)
         else:
-            D += E
+            glColor3f(*color)
+            glDrawArrays(GL_POINTS, 0, len(pts))
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+
+# software target for the same batches, for rendering without a GPU / window
+class Framebuffer:
+    def __init__(self, width=W_Width, height=W_Height):
+        self.width = width
+        self.height = height
+        self.pixels = numpy.zeros((height, width, 3), dtype=numpy.uint8)
+
+    def clear(self, color=(0, 0, 0)):
+        self.pixels[:] = numpy.round(numpy.asarray(color) * 255)
+
+    # square points like GL_POINTS without smoothing, game coords are the glOrtho(-250, 250, -350, 350) ones
+    def plot(self, pts, color, p=3):
+        if len(pts) == 0:
+            return
+        wx = pts[:, 0] + self.width / 2
+        wy = pts[:, 1] + self.height / 2
+        if p % 2:
+            x0 = numpy.floor(wx).astype(numpy.int64) - (p - 1) // 2
+            y0 = numpy.floor(wy).astype(numpy.int64) - (p - 1) // 2
+        else:
+            x0 = numpy.floor(wx + 0.5).astype(numpy.int64) - p // 2
+            y0 = numpy.floor(wy + 0.5).astype(numpy.int64) - p // 2
+        off = numpy.arange(p)
+        cols = (x0[:, None, None] + off[None, None, :]).repeat(p, axis=1).ravel()
+        rows = (y0[:, None, None] + off[None, :, None]).repeat(p, axis=2).ravel()
+
+        rgb = numpy.round(numpy.asarray(color, dtype=numpy.float64) * 255).astype(numpy.uint8)
+        if rgb.ndim == 2:
+            rgb = rgb.repeat(p * p, axis=0)
+
+        inside = (cols >= 0) & (cols < self.width) & (rows >= 0) & (rows < self.height)
+        if rgb.ndim == 2:
+            rgb = rgb[inside]
+        # row 0 of the array is the top of the window
+        self.pixels[self.height - 1 - rows[inside], cols[inside]] = rgb
+
+    def draw(self, batches):
+        for pts, color, p in batches:
+            self.plot(pts, color, p)
+
+    def save_ppm(self, path):
+        with open(path, "wb") as out:
+            out.write(b"P6 %d %d 255\n" % (self.width, self.height))
+            out.write(self.pixels.tobytes())
+
+    def save_png(self, path):
+        def chunk(kind, data):
+            return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+        # filter type 0 in front of every row
+        raw = numpy.zeros((self.height, self.width * 3 + 1), dtype=numpy.uint8)
+        raw[:, 1:] = self.pixels.reshape(self.height, -1)
+        with open(path, "wb") as out:
+            out.write(b"\x89PNG\r\n\x1a\n")
+            out.write(chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)))
+            out.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+            out.write(chunk(b"IEND", b""))
+
+    # raw RGB24 frames, e.g. piped into ffmpeg -f rawvideo -pix_fmt rgb24 -s 500x700
+    def write_raw(self, stream):
+        stream.write(self.pixels.tobytes())
 
 
 def convert_coordinate(x, y):
@@ -134,72 +223,266 @@ def collision(b1x, b1y, b1w, b1h, b2x, b2y, b2w, b2h):
         return False
 
 
+# game state / game logic, no OpenGL in here so it can run without a window
+class DiamondGame:
+    def __init__(self, max_speed=max_speed, speed_step=0.15, verbose=False):
+        self.max_speed = max_speed          # diamond speed cap
+        self.speed_step = speed_step        # diamond speed gain per catch
+        self.verbose = verbose              # print score / game over messages
+        self.acc = 0.0                      # real time not yet simulated
+        self.ticks = 0
+        self.reset()
+
+    def reset(self):
+        self.score = 0
+        self.n_x = 0                        # catcher x vals to move
+        self.speed1 = 1                     # diamond speed (vertical)
+        self.speed2 = 15                    # catcher speed (horizontal)
+        self.pause = False                  # pause?
+        self.game = True                    # game running?
+        self.cheat = False                  # cheat mode on or off?
+        self.new_diamond()
+
+    def new_diamond(self):
+        self.diamond_x = random.randint(-235, 235)     # diamond x vals for random pos
+        self.down = 50                                  # diamond y vals for animate
+        self.r_d, self.g_d, self.b_d = random.uniform(0.1, 1), random.uniform(0.1, 1), random.uniform(0.1, 1)
+        self.c_c = False                                # checked collision of diamond and catcher yet?
+
+    def move_basket(self, direction):
+        if self.game is True and self.pause is False and self.cheat is False:
+            if direction > 0 and 60 + self.n_x <= 250:
+                self.n_x += self.speed2
+            if direction < 0 and -60 + self.n_x >= -250:
+                self.n_x -= self.speed2
+
+    # advance by dt seconds of real time in fixed TICK steps
+    def step(self, dt):
+        self.acc += dt
+        while self.acc >= TICK:
+            self.acc -= TICK
+            self.tick()
+
+    def tick(self):
+        self.ticks += 1
+        if self.pause is True or self.game is False:
+            return
+
+        # vertical movement of diamond
+        if 350 - self.down > -350:
+            self.down += self.speed1
+
+        # cheat mode
+        if self.cheat:
+            self.follow(self.diamond_x)
+
+        self.check_catch()
+
+    def follow(self, target_x):
+        if self.n_x < target_x:
+            self.n_x = min(self.n_x + self.speed2, target_x)
+        elif self.n_x > target_x:
+            self.n_x = max(self.n_x - self.speed2, target_x)
+
+        # bound to screen
+        if 60 + self.n_x > 250:
+            self.n_x = 250 - 60
+        if -60 + self.n_x < -250:
+            self.n_x = -250 + 60
+
+    def check_catch(self):
+        # diamond measure
+        current_x = -10 + self.diamond_x
+        current_y = 315 - self.down
+
+        # bowl measure
+        cur_x = -60 + self.n_x
+        cur_y = -345
+
+        if current_y <= -345 and self.c_c is False:
+            if collision(current_x, current_y, 20, 45, cur_x, cur_y, 120, 15):
+                self.score += 1
+                if self.verbose:
+                    print(f"Score: {self.score}")
+                self.new_diamond()
+                self.speed1 = min(self.speed1 + self.speed_step, self.max_speed)  # increase difficulty
+            else:
+                if self.verbose:
+                    print(f'Game over! Score {self.score}')
+                self.game = False
+                self.c_c = True
+
+    # x, down and color of every diamond on screen
+    def diamonds(self):
+        if self.game is False:
+            return numpy.empty(0), numpy.empty(0), numpy.empty((0, 3))
+        return (numpy.array([self.diamond_x]), numpy.array([self.down]),
+                numpy.array([[self.r_d, self.g_d, self.b_d]]))
+
+
+# rain mode: many diamonds at once, a miss only costs the diamond
+class DiamondRain(DiamondGame):
+    def __init__(self, count, max_speed=max_speed, speed_step=0.15, verbose=False):
+        self.count = count
+        self.ncols = (500 + COLUMN_W - 1) // COLUMN_W
+        super().__init__(max_speed, speed_step, verbose)
+
+    def reset(self):
+        self.missed = 0
+        self.x = numpy.zeros(self.count, dtype=numpy.int64)
+        self.down = numpy.zeros(self.count)
+        self.speed = numpy.zeros(self.count)
+        self.color = numpy.zeros((self.count, 3))
+        self.col = numpy.full(self.count, -1, dtype=numpy.int64)     # x column of each diamond
+        self.buckets = [set() for _ in range(self.ncols)]           # diamonds in each x column
+        super().reset()
+        # stagger the first wave over the whole screen height
+        self.down[:] = numpy.random.uniform(-650, 50, self.count)
+
+    def new_diamond(self):
+        self.respawn(numpy.arange(self.count))
+
+    def respawn(self, idx):
+        n = len(idx)
+        self.x[idx] = numpy.random.randint(-235, 236, n)
+        self.down[idx] = 50
+        self.speed[idx] = numpy.random.uniform(0.5, 1.5, n) * self.speed1
+        self.color[idx] = numpy.random.uniform(0.1, 1, (n, 3))
+        self.move_to_columns(idx)
+
+    # only the respawned diamonds change x, so only they move between buckets
+    def move_to_columns(self, idx):
+        new = (self.x[idx] + 250) // COLUMN_W
+        old = self.col[idx]
+        moved = new != old
+        for i, a, b in zip(idx[moved].tolist(), old[moved].tolist(), new[moved].tolist()):
+            if a >= 0:
+                self.buckets[a].discard(i)
+            self.buckets[b].add(i)
+        self.col[idx] = new
+
+    def in_columns(self, x_lo, x_hi):
+        c0 = max(int((x_lo + 250) // COLUMN_W), 0)
+        c1 = min(int((x_hi + 250) // COLUMN_W), self.ncols - 1)
+        found = [i for c in range(c0, c1 + 1) for i in self.buckets[c]]
+        return numpy.array(found, dtype=numpy.int64)
+
+    def tick(self):
+        self.ticks += 1
+        if self.pause is True or self.game is False:
+            return
+
+        falling = 350 - self.down > -350
+        self.down[falling] += self.speed[falling]
+
+        # cheat mode: chase the lowest diamond
+        if self.cheat:
+            self.follow(self.x[numpy.argmax(self.down)])
+
+        self.check_catch()
+
+    def check_catch(self):
+        current_y = 315 - self.down
+        reached = current_y <= -345
+        if not reached.any():
+            return
+
+        # bowl measure
+        cur_x = -60 + self.n_x
+        cur_y = -345
+
+        # only diamonds in the columns under the basket can be caught (diamonds are 20 wide)
+        idx = self.in_columns(cur_x - 10, cur_x + 120 + 10)
+        idx = idx[reached[idx]]
+        dx = -10 + self.x[idx]
+        dy = current_y[idx]
+        hit = (dx < cur_x + 120) & (dx + 20 > cur_x) & (dy < cur_y + 15) & (dy + 45 > cur_y)
+        caught = idx[hit]
+
+        reached[caught] = False
+        lost = numpy.flatnonzero(reached)
+        self.score += len(caught)
+        self.missed += len(lost)
+        self.speed1 = min(self.speed1 + self.speed_step * len(caught) / self.count, self.max_speed)
+        self.respawn(numpy.concatenate((caught, lost)))
+
+    def diamonds(self):
+        return self.x, self.down, self.color
+
+
+# run the game without a window, e.g. to tune max_speed / speed_step
+def simulate(ticks, max_speed=max_speed, speed_step=0.15, cheat=True, rain=0):
+    if rain:
+        sim = DiamondRain(rain, max_speed, speed_step)
+    else:
+        sim = DiamondGame(max_speed, speed_step)
+    sim.cheat = cheat
+    for _ in range(ticks):
+        sim.tick()
+        if sim.game is False:
+            break
+    return sim
+
+
+sim = DiamondGame(verbose=True)
+scheduler = FrameScheduler(TARGET_FPS, name="Diamond Catcher")
+DIAMOND_SEGS = ((-10, 330, 0, 345), (0, 315, -10, 330), (0, 315, 10, 330), (10, 330, 0, 345))
+
+
 # game elements
 def drawShapes():
-    global pause
     # pause or running
-    if pause is False:
+    if sim.pause is False:
         # pause icon 
-        middle_point(-10, 300, -10, 345, .8, .6, .09)
-        middle_point(10, 300, 10, 345, .8, .6, .09)
+        middle_point_cached(-10, 300, -10, 345, .8, .6, .09)
+        middle_point_cached(10, 300, 10, 345, .8, .6, .09)
     else:
         # play icon 
-        middle_point(-15, 300, -15, 345, .8, .6, .09)
-        middle_point(-15, 300, 15, 322, .8, .6, .09)
-        middle_point(15, 322, -15, 345, .8, .6, .09)
+        middle_point_cached(-15, 300, -15, 345, .8, .6, .09)
+        middle_point_cached(-15, 300, 15, 322, .8, .6, .09)
+        middle_point_cached(15, 322, -15, 345, .8, .6, .09)
 
     # restart icon
-    middle_point(-240, 322, -210, 322, .03, .7, .9)
-    middle_point(-240, 322, -225, 300, .03, .7, .9)
-    middle_point(-240, 322, -225, 345, .03, .7, .9)
+    middle_point_cached(-240, 322, -210, 322, .03, .7, .9)
+    middle_point_cached(-240, 322, -225, 300, .03, .7, .9)
+    middle_point_cached(-240, 322, -225, 345, .03, .7, .9)
 
     # cross icon
-    middle_point(245, 300, 210, 345, .9, .2, .03)
-    middle_point(245, 345, 210, 300, .9, .2, .03)
+    middle_point_cached(245, 300, 210, 345, .9, .2, .03)
+    middle_point_cached(245, 345, 210, 300, .9, .2, .03)
 
 
 def diamond_basket():
-    global diamond_x, down, n_x, r_d, g_d, b_d, game
-
-    # diamond
-    if game is True:
-        middle_point(-10 + diamond_x, 330 - down, 0 + diamond_x, 345 - down, r_d, g_d, b_d)
-        middle_point(0 + diamond_x, 315 - down, -10 + diamond_x, 330 - down, r_d, g_d, b_d)
-        middle_point(0 + diamond_x, 315 - down, 10 + diamond_x, 330 - down, r_d, g_d, b_d)
-        middle_point(10 + diamond_x, 330 - down, 0 + diamond_x, 345 - down, r_d, g_d, b_d)
+    # diamonds (shape rasterized once at x = 0, down = 0 and shifted)
+    xs, downs, colors = sim.diamonds()
+    middle_point_instances(DIAMOND_SEGS, numpy.column_stack((xs, -downs)), colors)
 
     # basket
-    if not game:
+    if not sim.game:
         r, g, b = 0.9, 0.2, 0.03  # game over = red
     else:
         r, g, b = 1.0, 1.0, 1.0  # normal = white
 
-    middle_point(-50 + n_x, -345, 50 + n_x, -345, r, g, b)
-    middle_point(-50 + n_x, -345, -60 + n_x, -330, r, g, b)
-    middle_point(50 + n_x, -345, 60 + n_x, -330, r, g, b)
-    middle_point(60 + n_x, -330, -60 + n_x, -330, r, g, b)
+    middle_point_cached(-50, -345, 50, -345, r, g, b, ox=sim.n_x)
+    middle_point_cached(-50, -345, -60, -330, r, g, b, ox=sim.n_x)
+    middle_point_cached(50, -345, 60, -330, r, g, b, ox=sim.n_x)
+    middle_point_cached(60, -330, -60, -330, r, g, b, ox=sim.n_x)
 
 
 # game actions
 def specialKeyListener(key, x, y):
-    global n_x, speed2
-    if game is True and pause is False and cheat is False:  
-        if key == GLUT_KEY_RIGHT:
-            if 60 + n_x <= 250:
-                n_x += speed2
-
-        if key == GLUT_KEY_LEFT:
-            if -60 + n_x >= -250:
-                n_x -= speed2
-        glutPostRedisplay()
+    if key == GLUT_KEY_RIGHT:
+        sim.move_basket(1)
+    if key == GLUT_KEY_LEFT:
+        sim.move_basket(-1)
+    glutPostRedisplay()
 
 
 # cheat mode toggle
 def keyboardListener(key, x, y):
-    global cheat
     if key == b'c' or key == b'C':
-        cheat = not cheat
-        if cheat:
+        sim.cheat = not sim.cheat
+        if sim.cheat:
             print("Cheat Mode ON")
         else:
             print("Cheat Mode OFF")
@@ -207,14 +490,14 @@ def keyboardListener(key, x, y):
 
 
 def mouseListener(button, state, x, y):
-    global pause, new_game, end, game, score, diamond_x, down, n_x, speed1, speed2, c_c, r_d, g_d, b_d, last, cheat
+    global new_game, end, last
     if button == GLUT_LEFT_BUTTON:
         if state == GLUT_DOWN:
             c_X, c_Y = convert_coordinate(x, y)
 
             # pause/play
-            if -15 <= c_X <= 15 and 300 <= c_Y <= 345 and game is True:
-                pause = not pause
+            if -15 <= c_X <= 15 and 300 <= c_Y <= 345 and sim.game is True:
+                sim.pause = not sim.pause
 
             # restart
             if -240 <= c_X <= -210 and 300 <= c_Y <= 345:
@@ -225,64 +508,19 @@ def mouseListener(button, state, x, y):
                 end = True
 
     if end:
-        print(f'GoodBye! Score = {score}')
+        print(f'GoodBye! Score = {sim.score}')
         glutLeaveMainLoop()
 
     if new_game:
         print("Starting Over!")
-        pause = False
         end = False
         new_game = False
-        cheat = False
-        score = 0
-        diamond_x = random.randint(-235, 235)
-        r_d, g_d, b_d = random.uniform(0.1, 1), random.uniform(0.1, 1), random.uniform(0.1, 1)
-        down = 50
-        n_x = 0
-        game = True
-        speed1 = 1
-        speed2 = 15
+        sim.reset()
         last = time.time()
-        c_c = False
 
     glutPostRedisplay()
 
 
-# game play / game logic
-def run():
-    global pause, new_game, end, game, score, diamond_x, down, n_x, speed1, speed2, c_c, r_d, g_d, b_d
-    drawShapes()
-    diamond_basket()
-
-    # diamond measure
-    current_x = -10 + diamond_x
-    current_y = 315 - down
-
-    # bowl measure
-    cur_x = -60 + n_x
-    cur_y = -345
-
-    # check collision 
-    if current_y <= -345 and c_c is False:
-        j = collision(current_x, current_y, 20, 45, cur_x, cur_y, 120, 15)
-        if j is True:
-            pause = False
-            end = False
-            new_game = False
-            score += 1
-            r_d, g_d, b_d = random.uniform(0.1, 1), random.uniform(0.1, 1), random.uniform(0.1, 1)
-            print(f"Score: {score}")
-            diamond_x = random.randint(-235, 235)
-            down = 50
-            game = True
-            c_c = False
-            speed1 = min(speed1 + 0.15, max_speed)  # increase difficulty
-        else:
-            print(f'Game over! Score {score}')
-            game = False
-            c_c = True
-
-
 def display():
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
     glClearColor(0, 0, 0, 0)
@@ -292,40 +530,45 @@ def display():
     gluLookAt(0, 0, 200, 0, 0, 0, 0, 1, 0)
     glMatrixMode(GL_MODELVIEW)
     iterate()
-    run()
+    drawShapes()
+    diamond_basket()
+    flush_points()
     glutSwapBuffers()
 
 
-def animate():
-    global down, speed1, pause, game, last, n_x, cheat, speed2, diamond_x
-
-    current = time.time()
-    delta = current - last
-    last = current
-
-    # vertical movement of diamond
-    if pause is False and game is True:
-        if 350 - down > -350:
-            down += speed1 * delta * 144
+# play headless with the auto-catcher and draw every frame into a Framebuffer
+# out is a directory for numbered .png / .ppm files, or '-' for a raw RGB stream on stdout
+def render_headless(frames, out, fmt="png"):
+    fb = Framebuffer()
+    sim.cheat = True
+    if out != "-":
+        os.makedirs(out, exist_ok=True)
+    t0 = time.perf_counter()
+    for i in range(frames):
+        sim.step(1 / TARGET_FPS)
+        drawShapes()
+        diamond_basket()
+        fb.clear()
+        fb.draw(take_batches())
+        if out == "-":
+            fb.write_raw(sys.stdout.buffer)
+        elif fmt == "ppm":
+            fb.save_ppm(os.path.join(out, f"frame_{i:05d}.ppm"))
         else:
-            pass
+            fb.save_png(os.path.join(out, f"frame_{i:05d}.png"))
+    elapsed = time.perf_counter() - t0
+    print(f"{frames} frames in {elapsed:.2f} s ({frames / elapsed:.0f} fps)", file=sys.stderr)
 
-    # cheat mode 
-    if cheat and pause is False and game is True:
-        target_x = diamond_x
-        move_amount = speed2 * delta * 144  
 
-        if n_x < target_x:
-            n_x = min(n_x + move_amount, target_x)
-        elif n_x > target_x:
-            n_x = max(n_x - move_amount, target_x)
+def animate():
+    global last
 
-        # bound to screen
-        if 60 + n_x > 250:
-            n_x = 250 - 60
-        if -60 + n_x < -250:
-            n_x = -250 + 60
+    scheduler.wait()
+    current = time.time()
+    delta = min(current - last, MAX_FRAME_TIME)
+    last = current
 
+    sim.step(delta)
     glutPostRedisplay()
 
 
@@ -338,15 +581,51 @@ def iterate():
     glLoadIdentity()
 
 
-# GLUT
-glutInit()
-glutInitDisplayMode(GLUT_DEPTH | GLUT_DOUBLE | GLUT_RGB)
-glutInitWindowSize(500, 700)
-glutInitWindowPosition(0, 0)
-wind = glutCreateWindow(b"Catch the Diamonds!")
-glutDisplayFunc(display)
-glutIdleFunc(animate)
-glutSpecialFunc(specialKeyListener)
-glutKeyboardFunc(keyboardListener)  
-glutMouseFunc(mouseListener)
-glutMainLoop()
+def main():
+    global last
+    glutInit()
+    glutInitDisplayMode(GLUT_DEPTH | GLUT_DOUBLE | GLUT_RGB)
+    glutInitWindowSize(500, 700)
+    glutInitWindowPosition(0, 0)
+    wind = glutCreateWindow(b"Catch the Diamonds!")
+    glutDisplayFunc(display)
+    glutIdleFunc(animate)
+    glutSpecialFunc(specialKeyListener)
+    glutKeyboardFunc(keyboardListener)  
+    glutMouseFunc(mouseListener)
+    last = time.time()
+    glutMainLoop()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Catch the Diamonds!")
+    parser.add_argument("--simulate", type=int, metavar="TICKS",
+                        help="run TICKS fixed steps headless with the auto-catcher and print the result")
+    parser.add_argument("--max-speed", type=float, default=max_speed)
+    parser.add_argument("--speed-step", type=float, default=0.15)
+    parser.add_argument("--rain", type=int, default=0, metavar="N",
+                        help="rain mode with N diamonds falling at once")
+    parser.add_argument("--render", type=int, metavar="FRAMES",
+                        help="render FRAMES frames headless into a software framebuffer")
+    parser.add_argument("--out", default="frames",
+                        help="directory for --render frames, or '-' for raw RGB24 on stdout")
+    parser.add_argument("--format", choices=("png", "ppm"), default="png")
+    args = parser.parse_args()
+    if args.simulate:
+        t0 = time.perf_counter()
+        result = simulate(args.simulate, args.max_speed, args.speed_step, rain=args.rain)
+        print(f"{result.ticks} ticks ({result.ticks * TICK:.0f} s game time) in {time.perf_counter() - t0:.2f} s, "
+              f"score {result.score}, speed {result.speed1:.2f}, game over: {not result.game}")
+        if args.rain:
+            print(f"missed {result.missed}")
+    else:
+        if args.rain:
+            sim = DiamondRain(args.rain, args.max_speed, args.speed_step, verbose=True)
+        else:
+            sim = DiamondGame(args.max_speed, args.speed_step, verbose=True)
+        if args.render:
+            sim.verbose = False
+            render_headless(args.render, args.out, args.format)
+        else:
+            main()
@@ -17,6 +17,7 @@
 # - Pause Mode (press 'P')
 # - Main Menu (G: Start, Z: Controls, Q: Quit)
 # - **Nova Powerup** (F to use; destroys all enemies. 3 max charges; shoot pickup to refill)
+# - Gravity Mode (N): the planet and any moons (--moons) pull bullets and meteors
 # Notes:
 # - No glutTimerFunc used; updates happen in idle()
 # - Camera uses gluPerspective + gluLookAt
@@ -26,6 +27,9 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 from OpenGL.GLUT import *
 import math, random, time, sys
+import numpy
+from frame_scheduler import FrameScheduler
+from bitmap_text import HudLayer, draw_string, text_width
 
 # -------------------------------
 # Config
@@ -33,6 +37,7 @@ import math, random, time, sys
 WIN_W, WIN_H = 1200, 800
 ASPECT = WIN_W / WIN_H
 FOVY = 70.0
+TARGET_FPS = 60
 
 # Planet/player
 PLANET_R = 120.0
@@ -45,9 +50,15 @@ POINT_SIZE = 5
 
 # Enemies
 NUM_METEORS = 6
-NUM_ALIENS = 3
+METEOR_R = 12.0
+ALIEN_R = 14.0
+NUM_ALIENS = 3         # always on the field; swarm wave aliens come on top and don't respawn
+SWARM_WAVE_SIZE = 1000
 METEOR_SPEED = 90.0
 ALIEN_BASE_SPEED = 80.0
+ALIEN_SEPARATION = False  # aliens closer than ALIEN_SEP_R steer apart
+ALIEN_SEP_R = 32.0
+ALIEN_SEP_WEIGHT = 4.0
 
 # Shield
 SHIELD_MAX = 6.0      # seconds when fully charged
@@ -62,6 +73,455 @@ NOVA_LIFE_SECS   = 12.0
 # Game
 START_LIFE = 5
 
+# Pools (most bullets / explosions alive at once; when full the oldest is reused)
+BULLET_POOL = 256
+EXPLOSION_POOL = 128
+
+# Bodies smaller than this on screen (pixels across) are drawn as points instead of spheres
+SPRITE_MAX_PX = 8.0
+PX_PER_UNIT = (WIN_H / 2) / math.tan(math.radians(FOVY / 2))  # on-screen pixels per world unit at distance 1
+
+# Collision broadphase: rings of BIN_RING_W around the planet, cut into BIN_SECTORS angles
+BIN_RING_W = 50.0
+BIN_RINGS = 20        # the last ring takes everything further out
+BIN_SECTORS = 64
+METEOR_HIT_R = 16.0
+ALIEN_HIT_R = 18.0
+PICKUP_HIT_R = 16.0
+
+# Gravity mode: the planet and its moons pull bullets and meteors in the z=0 plane
+GRAVITY_GM = 2.0e6        # planet's G*M, units^3/s^2
+GRAVITY_SOFTEN = 20.0     # softening length, keeps the pull finite right next to a body
+NUM_MOONS = 0
+MOON_GM_TOTAL = 0.25*GRAVITY_GM  # split between the moons, so more moons don't add mass
+MOON_MIN_R = 300.0
+MOON_MAX_R = 800.0
+MOON_R = 6.0
+BH_THETA = 0.5            # Barnes-Hut: a cell narrower than BH_THETA times its distance pulls as one body
+BH_LEAF = 8               # most moons in one quadtree leaf
+BH_MIN_MOONS = 512        # below this summing the moons directly beats building the tree (see --bench-gravity)
+
+# -------------------------------
+# Simulation clock
+# -------------------------------
+
+class SimClock:
+    # Game time in seconds. Only step() moves it forward, so every timer
+    # (bullet life, explosions, nova pickup, shield cooldown) stops while the
+    # game is paused and runs as fast as step() is called when fast-forwarding.
+    def __init__(self, t=0.0):
+        self.t = t
+
+    def now(self):
+        return self.t
+
+    def advance(self, dt):
+        self.t += dt
+
+
+# -------------------------------
+# Entity storage
+# -------------------------------
+
+class TimedPool:
+    # Fixed-size arrays of short-lived entities (bullets, explosions).
+    # Free slots are kept on a stack, so spawn() and kill() are O(1), and
+    # everything past its life is dropped at once by expire().
+    def __init__(self, capacity):
+        self.pos = numpy.zeros((capacity, 3))
+        self.vel = numpy.zeros((capacity, 3))
+        self.born = numpy.zeros(capacity)     # clock time when spawned
+        self.life = numpy.zeros(capacity)     # seconds until it expires
+        self.size = numpy.zeros(capacity)     # radius, for explosions
+        self.alive = numpy.zeros(capacity, dtype=bool)
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.alive[:] = False
+        self.free = list(range(len(self.alive) - 1, -1, -1))  # pop() hands out low slots first
+        self.top = 0      # no slot at or above this has been used since clear()
+        self.count = 0
+
+    def spawn(self, pos, t, life, vel=(0.0, 0.0, 0.0), size=0.0):
+        if self.free:
+            i = self.free.pop()
+            self.count += 1
+        else:
+            i = int(numpy.argmin(self.born))  # full: reuse the oldest
+        self.pos[i] = pos; self.vel[i] = vel
+        self.born[i] = t; self.life[i] = life; self.size[i] = size
+        self.alive[i] = True
+        if i >= self.top: self.top = i + 1
+        return i
+
+    def kill(self, i):
+        if self.alive[i]:
+            self.alive[i] = False
+            self.free.append(i)
+            self.count -= 1
+
+    # drop everything older than its life at clock time t
+    def expire(self, t):
+        n = self.top
+        dead = numpy.flatnonzero(self.alive[:n] & (t - self.born[:n] > self.life[:n]))
+        if len(dead):
+            self.alive[dead] = False
+            self.free.extend(dead.tolist())
+            self.count -= len(dead)
+
+    # slots of the live entities
+    def active(self):
+        return numpy.flatnonzero(self.alive[:self.top])
+
+
+class PolarGrid:
+    # Points on the z=0 plane binned by radius ring and polar angle sector,
+    # stored sorted by cell so each cell is a contiguous run of `order`.
+    # A lookup only touches the cells around one spot, so its cost follows
+    # how crowded that spot is, not how many points there are.
+    def __init__(self, ring_w=BIN_RING_W, rings=BIN_RINGS, sectors=BIN_SECTORS):
+        self.ring_w = ring_w
+        self.rings = rings
+        self.sectors = sectors
+        self.sector_w = 2*math.pi / sectors
+        self.build(numpy.zeros(0), numpy.zeros(0))
+
+    def cells(self, x, y):
+        ring = numpy.minimum((numpy.hypot(x, y) / self.ring_w).astype(int), self.rings - 1)
+        sector = ((numpy.arctan2(y, x) + math.pi) / self.sector_w).astype(int) % self.sectors
+        return ring*self.sectors + sector
+
+    def build(self, x, y):
+        cell = self.cells(x, y)
+        self.order = numpy.argsort(cell, kind="stable")
+        self.start = numpy.searchsorted(cell[self.order], numpy.arange(self.rings*self.sectors + 1))
+
+    # indices (ascending) of every point that can be within radius of a spot in the given cell
+    def near(self, cell, radius):
+        S = self.sectors
+        ring, s = divmod(int(cell), S)
+        r_lo = ring*self.ring_w
+        r_hi = (ring + 1)*self.ring_w if ring < self.rings - 1 else math.inf
+        ring_a = max(0, int((r_lo - radius) // self.ring_w))
+        ring_b = min(self.rings - 1, int((r_hi + radius) // self.ring_w)) if r_hi < math.inf else self.rings - 1
+
+        # within radius of a point at distance r the angle changes by at most asin(radius / r)
+        k = S if r_lo <= radius else math.ceil(math.asin(radius / r_lo) / self.sector_w)
+        start, order = self.start, self.order
+        if 2*k + 1 >= S:
+            runs = [(ring_a*S, (ring_b + 1)*S)]
+        else:
+            runs = []
+            s0, s1 = s - k, s + k + 1
+            for r in range(ring_a, ring_b + 1):
+                base = r*S
+                if s0 < 0:
+                    runs += [(base + s0 + S, base + S), (base, base + s1)]
+                elif s1 > S:
+                    runs += [(base + s0, base + S), (base, base + s1 - S)]
+                else:
+                    runs.append((base + s0, base + s1))
+        idx = numpy.concatenate([order[start[a]:start[b]] for a, b in runs])
+        idx.sort()
+        return idx
+
+
+class AlienSwarm:
+    # Aliens as parallel arrays, the first `count` rows are alive.
+    # Each alien circles the planet on its own radius while drifting
+    # toward the player; steer() moves all of them in one pass.
+    FIELDS = ("pos", "theta", "radius", "speed")
+    SEP_SIDE = 1 << 16  # cell key stride, far more cells than the play field needs
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.pos = numpy.zeros((capacity, 3))
+        self.theta = numpy.zeros(capacity)    # degrees, where on its circle it heads for
+        self.radius = numpy.zeros(capacity)   # radius of that circle
+        self.speed = numpy.zeros(capacity)
+        self.planned = None                   # (key, velocities) from velocity(), until the swarm changes
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, idx):
+        # Spawn aliens in the same shooting plane (z=0) so they are always hittable
+        n = len(idx)
+        r = numpy.random.uniform(420.0, 640.0, n)
+        a = numpy.radians(numpy.random.uniform(0, 360, n))
+        self.pos[idx, 0] = r*numpy.cos(a); self.pos[idx, 1] = r*numpy.sin(a); self.pos[idx, 2] = 0.0
+        self.theta[idx] = numpy.random.uniform(0, 360, n)
+        self.radius[idx] = r
+        self.speed[idx] = ALIEN_BASE_SPEED
+        self.planned = None
+
+    def add(self, n):
+        need = self.count + n
+        if need > len(self.pos):
+            cap = max(need, 2*len(self.pos))
+            for name in self.FIELDS:
+                old = getattr(self, name)
+                new = numpy.zeros((cap,) + old.shape[1:])
+                new[:self.count] = old[:self.count]
+                setattr(self, name, new)
+        self.spawn(numpy.arange(self.count, need))
+        self.count = need
+
+    def reset(self, n):
+        self.count = 0
+        self.add(n)
+
+    # aliens that were destroyed: respawn enough to keep NUM_ALIENS, drop the rest
+    def replace(self, idx):
+        if not len(idx): return
+        idx = numpy.unique(numpy.asarray(idx, dtype=numpy.int64))
+        n_back = max(0, min(len(idx), NUM_ALIENS - (self.count - len(idx))))
+        self.spawn(idx[:n_back])
+        drop = idx[n_back:]
+        if len(drop):
+            keep = numpy.ones(self.count, dtype=bool)
+            keep[drop] = False
+            n = self.count - len(drop)
+            for name in self.FIELDS:
+                arr = getattr(self, name)
+                arr[:n] = arr[:self.count][keep]
+            self.count = n
+            self.planned = None
+
+    # per-alien push away from neighbours closer than ALIEN_SEP_R, found through a grid
+    def separation(self):
+        n = self.count
+        pos = self.pos[:n, :2]
+        c = numpy.floor(pos / ALIEN_SEP_R).astype(numpy.int64)
+        keys = c[:, 0]*self.SEP_SIDE + c[:, 1]
+        order = numpy.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        # pairs (i, j) from the 3x3 cells around each alien
+        pi, pj = [], []
+        for ox in (-1, 0, 1):
+            for oy in (-1, 0, 1):
+                q = keys + ox*self.SEP_SIDE + oy
+                lo = numpy.searchsorted(sorted_keys, q, "left")
+                cnt = numpy.searchsorted(sorted_keys, q, "right") - lo
+                total = int(cnt.sum())
+                if total == 0:
+                    continue
+                first = numpy.cumsum(cnt) - cnt
+                pi.append(numpy.repeat(numpy.arange(n), cnt))
+                pj.append(order[numpy.repeat(lo, cnt) + numpy.arange(total) - numpy.repeat(first, cnt)])
+        push = numpy.zeros((n, 2))
+        if not pi:
+            return push
+        pi = numpy.concatenate(pi); pj = numpy.concatenate(pj)
+        d = pos[pi] - pos[pj]
+        dist = numpy.hypot(d[:, 0], d[:, 1])
+        close = (dist < ALIEN_SEP_R) & (pi != pj)
+        pi, d, dist = pi[close], d[close], dist[close]
+        # grows linearly from 0 at ALIEN_SEP_R; exactly stacked aliens are left alone
+        w = ALIEN_SEP_WEIGHT * (ALIEN_SEP_R - dist) / numpy.maximum(dist, 1e-9)
+        w[dist == 0] = 0.0
+        push[:, 0] = numpy.bincount(pi, weights=d[:, 0]*w, minlength=n)
+        push[:, 1] = numpy.bincount(pi, weights=d[:, 1]*w, minlength=n)
+        return push
+
+    # orbit-plus-chase velocity (units/sec, n x 2) toward (px, py) that the next steer() gives every alien
+    def velocity(self, dt, px, py):
+        key = (dt, px, py, self.count)
+        if self.planned is not None and self.planned[0] == key:
+            return self.planned[1]
+        n = self.count
+        x = self.pos[:n, 0]; y = self.pos[:n, 1]
+        rad = numpy.radians(self.theta[:n] + 30.0 * dt)
+        vx = (self.radius[:n]*numpy.cos(rad) - x) * 0.6 + (px - x) * 0.4
+        vy = (self.radius[:n]*numpy.sin(rad) - y) * 0.6 + (py - y) * 0.4
+        if ALIEN_SEPARATION and n > 1:
+            push = self.separation()
+            vx += push[:, 0]; vy += push[:, 1]
+        L = numpy.hypot(vx, vy)
+        scale = numpy.divide(self.speed[:n], L, out=numpy.zeros(n), where=L > 0)
+        v = numpy.column_stack((vx * scale, vy * scale))
+        self.planned = (key, v)
+        return v
+
+    # move every alien along its velocity() for dt
+    def steer(self, dt, px, py):
+        n = self.count
+        if n == 0: return
+        v = self.velocity(dt, px, py)
+        self.theta[:n] += 30.0 * dt
+        self.pos[:n, :2] += v * dt
+        self.pos[:n, 2] = 0.0
+        self.planned = None
+
+
+# -------------------------------
+# Gravity
+# -------------------------------
+
+# first[i], first[i]+1, ... for count[i] values each, all concatenated
+def concat_ranges(first, count):
+    total = int(count.sum())
+    offset = numpy.cumsum(count) - count
+    return numpy.repeat(first - offset, count) + numpy.arange(total)
+
+
+# acceleration at each (px, py) from point masses gm at (bx, by), summed pair by pair
+def pull_direct(px, py, bx, by, gm, soften=GRAVITY_SOFTEN, chunk=1 << 20):
+    ax = numpy.zeros(len(px)); ay = numpy.zeros(len(px))
+    rows = max(1, chunk // max(len(gm), 1))  # bounds the temporary arrays to about `chunk` pairs
+    s2 = soften*soften
+    for a in range(0, len(px), rows):
+        dx = bx[None, :] - px[a:a+rows, None]
+        dy = by[None, :] - py[a:a+rows, None]
+        w = gm / (dx*dx + dy*dy + s2)**1.5
+        ax[a:a+rows] = (dx*w).sum(axis=1)
+        ay[a:a+rows] = (dy*w).sum(axis=1)
+    return ax, ay
+
+
+class QuadTree:
+    # Barnes-Hut tree over point masses on the z=0 plane. build() sorts the
+    # bodies along a Z-order curve, so every cell is a contiguous run of
+    # them, and makes the cells one level at a time. accel() walks the tree
+    # for all query points together as a frontier of (point, cell) pairs:
+    # far cells pull as one body at their centre of mass, near leaves are
+    # summed body by body and the other cells are swapped for their children.
+    DEPTH = 16  # deepest cells are 1/65536 of the bounding square, they never split
+
+    def __init__(self, theta=BH_THETA, leaf=BH_LEAF):
+        self.theta = theta
+        self.leaf = leaf
+        self.build(numpy.zeros((0, 2)), numpy.zeros(0))
+
+    def __len__(self):
+        return len(self.m)
+
+    @staticmethod
+    def _spread(v):
+        # the low 16 bits of v moved to the even bit positions
+        v = (v | (v << 8)) & 0x00FF00FF
+        v = (v | (v << 4)) & 0x0F0F0F0F
+        v = (v | (v << 2)) & 0x33333333
+        v = (v | (v << 1)) & 0x55555555
+        return v
+
+    def build(self, xy, m):
+        n = len(m)
+        D = self.DEPTH
+        span = 1.0
+        code = numpy.zeros(n, dtype=numpy.int64)
+        if n:
+            lo = xy.min(axis=0)
+            span = max(float((xy.max(axis=0) - lo).max()), 1e-9)
+            q = numpy.minimum(((xy - lo) / span * (1 << D)).astype(numpy.int64), (1 << D) - 1)
+            code = self._spread(q[:, 0]) | (self._spread(q[:, 1]) << 1)
+        order = numpy.argsort(code, kind="stable")
+        code = code[order]
+        self.x = xy[order, 0]; self.y = xy[order, 1]; self.m = m[order]
+
+        # per cell: bodies [start, end), width, children [child, child + n_child); cells of a level are consecutive
+        starts, ends, widths, childs, n_childs = [], [], [], [], []
+        start = numpy.zeros(1 if n else 0, dtype=numpy.int64)
+        end = numpy.full(len(start), n, dtype=numpy.int64)
+        next_id = len(start)
+        level = 0
+        while len(start):
+            count = end - start
+            split = count > self.leaf if level < D else numpy.zeros(len(start), dtype=bool)
+            child = numpy.full(len(start), -1, dtype=numpy.int64)
+            n_child = numpy.zeros(len(start), dtype=numpy.int64)
+            if split.any():
+                # a child is a run of bodies sharing the code one level further down
+                b = concat_ranges(start[split], count[split])
+                key = code[b] >> 2*(D - level - 1)
+                first = numpy.flatnonzero(numpy.diff(key, prepend=-1))
+                parent = numpy.repeat(numpy.arange(int(split.sum())), count[split])[first]
+                n_child[split] = numpy.bincount(parent, minlength=int(split.sum()))
+                child[split] = next_id + numpy.cumsum(n_child[split]) - n_child[split]
+                next_start = b[first]
+                last = numpy.append(first[1:], len(b)) - 1
+                next_end = b[last] + 1
+            else:
+                next_start = next_end = numpy.zeros(0, dtype=numpy.int64)
+            starts.append(start); ends.append(end); childs.append(child); n_childs.append(n_child)
+            widths.append(numpy.full(len(start), span / (1 << level)))
+            next_id += len(next_start)
+            start, end = next_start, next_end
+            level += 1
+
+        cat = lambda parts: numpy.concatenate(parts) if parts else numpy.zeros(0, dtype=numpy.int64)
+        self.start, self.end = cat(starts), cat(ends)
+        self.child, self.n_child = cat(childs), cat(n_childs)
+        self.width = cat(widths).astype(float)
+        cm = numpy.concatenate(([0.0], numpy.cumsum(self.m)))
+        cx = numpy.concatenate(([0.0], numpy.cumsum(self.m*self.x)))
+        cy = numpy.concatenate(([0.0], numpy.cumsum(self.m*self.y)))
+        self.mass = cm[self.end] - cm[self.start]
+        safe = numpy.maximum(self.mass, 1e-300)
+        self.cx = (cx[self.end] - cx[self.start]) / safe
+        self.cy = (cy[self.end] - cy[self.start]) / safe
+
+    # acceleration at each (px, py) from all the bodies in the tree
+    def accel(self, px, py, soften=GRAVITY_SOFTEN):
+        nq = len(px)
+        ax = numpy.zeros(nq); ay = numpy.zeros(nq)
+        if not len(self.m) or not nq:
+            return ax, ay
+        s2 = soften*soften
+        th2 = self.theta*self.theta
+
+        def pull(q, dx, dy, m):
+            w = m / (dx*dx + dy*dy + s2)**1.5
+            ax[:] += numpy.bincount(q, weights=dx*w, minlength=nq)
+            ay[:] += numpy.bincount(q, weights=dy*w, minlength=nq)
+
+        q = numpy.arange(nq); cell = numpy.zeros(nq, dtype=numpy.int64)
+        while len(q):
+            dx = self.cx[cell] - px[q]; dy = self.cy[cell] - py[q]
+            leaf = self.n_child[cell] == 0
+            count = self.end[cell] - self.start[cell]
+            # far cells, and leaves holding one body, pull from their centre of mass
+            whole = (self.width[cell]**2 < th2*(dx*dx + dy*dy)) | (leaf & (count == 1))
+            pull(q[whole], dx[whole], dy[whole], self.mass[cell[whole]])
+
+            near = leaf & ~whole
+            if near.any():
+                b = concat_ranges(self.start[cell[near]], count[near])
+                bq = numpy.repeat(q[near], count[near])
+                pull(bq, self.x[b] - px[bq], self.y[b] - py[bq], self.m[b])
+
+            split = ~leaf & ~whole
+            n_child = self.n_child[cell[split]]
+            cell = concat_ranges(self.child[cell[split]], n_child)
+            q = numpy.repeat(q[split], n_child)
+        return ax, ay
+
+
+class Moons:
+    # Point masses on circular orbits around the planet, only there in
+    # gravity mode. Each one's speed is what the planet's pull alone gives
+    # it, and its place is worked out from the clock, so nothing is stepped.
+    def __init__(self, n=0):
+        self.reset(n)
+
+    def __len__(self):
+        return len(self.gm)
+
+    def reset(self, n):
+        self.radius = numpy.random.uniform(MOON_MIN_R, MOON_MAX_R, n)
+        self.phase = numpy.random.uniform(0, 2*math.pi, n)
+        self.omega = numpy.sqrt(GRAVITY_GM / self.radius**3)  # radians/sec
+        self.gm = numpy.full(n, MOON_GM_TOTAL / max(n, 1))
+
+    # x, y of every moon at clock time t
+    def positions(self, t):
+        a = self.phase + self.omega*t
+        return numpy.stack([self.radius*numpy.cos(a), self.radius*numpy.sin(a)], axis=1)
+
 # -------------------------------
 # State
 # -------------------------------
@@ -71,22 +531,35 @@ orbit_r = PLAYER_INIT_R
 player_life = START_LIFE
 player_score = 0
 
-# bullets: list of dicts
-bullets = []  # {pos:[x,y,z], vel:[vx,vy,vz], born:t}
+# bullets: pos, vel, born, life
+bullets = TimedPool(BULLET_POOL)
+
+# meteors: one row each
+meteor_pos = numpy.zeros((NUM_METEORS, 3))
+meteor_vel = numpy.zeros((NUM_METEORS, 3))
+
+# aliens: NUM_ALIENS plus any swarm wave
+aliens = AlienSwarm()
+
+# broadphase over the pickup, meteors and aliens, rebuilt each bullet update
+target_grid = PolarGrid()
 
-# meteors / aliens
-meteors = []  # {pos:[x,y,z], vel:[vx,vy,vz]}
-aliens = []   # {pos:[x,y,z], dir_theta:float, radius:float, speed:float}
+# explosions: pos, size (start radius), born, life
+explosions = TimedPool(EXPLOSION_POOL)
 
-# explosions: {pos:[x,y,z], r:float, born:t, life:float}
-explosions = []
+# gravity mode (N), see apply_gravity(); the tree is rebuilt from the moons every update
+gravity = False
+moons = Moons(NUM_MOONS)
+moon_tree = QuadTree()
 
 # shield state
 shield_active = False
 shield_time_left = 0.0
 shield_last_used = -999.0
 
-# nova powerup state
+# nova powerup state (spawned / collected count pickups since start, for balancing runs)
+nova_spawned = 0
+nova_collected = 0
 nova_charges = NOVA_MAX_CHARGES
 nova_pickup_active = False
 nova_pickup_pos = [0.0, 0.0, 0.0]
@@ -98,13 +571,22 @@ free_cam = False   # False = third-person follow; True = free/orbit cam
 cam_yaw = 45.0
 cam_pitch = 25.0
 cam_dist = 520.0
+cam_eye = (0.0, -800.0, 320.0)  # set by setup_camera()
+
+# display lists of solid spheres, keyed by (radius, slices)
+sphere_lists = {}
+
+# unit sphere vertex / index arrays for draw_sphere(), keyed by (slices, stacks, wire)
+sphere_meshes = {}
 
 # cheat
 cheat = False
 cheat_fire_timer = 0.0
 
 # timing
-_last_time = time.time()
+_last_time = time.perf_counter()  # wall clock, only used to measure idle() frame time
+clock = SimClock()                # game time, see set_clock()
+scheduler = FrameScheduler(TARGET_FPS, name="Planet Guardian")
 
 # flags / game state
 paused = False
@@ -115,6 +597,9 @@ GAME_OVER = 3
 
 game_state = GAME_MENU  # start at Main Menu
 
+# HUD / menu text kept in a texture, redrawn only when what it shows changes
+hud_layer = HudLayer()
+
 # -------------------------------
 # Utility
 # -------------------------------
@@ -123,18 +608,10 @@ def clamp(x, lo, hi):
     return lo if x < lo else (hi if x > hi else x)
 
 
-def length3(v):
-    return math.sqrt(v[0]*v[0] + v[1]*v[1] + v[2]*v[2])
-
-
-def norm3(v):
-    L = length3(v)
-    if L == 0: return [0.0, 0.0, 0.0]
-    return [v[0]/L, v[1]/L, v[2]/L]
-
-
-def now():
-    return time.time()
+# use another clock (e.g. one shared with a test harness) for all game timers
+def set_clock(c):
+    global clock
+    clock = c
 
 # -------------------------------
 # Scene helpers
@@ -157,48 +634,65 @@ def player_tangent_dir():
     return [tx, ty, tz]
 
 
-def spawn_meteor():
+def respawn_meteors(idx):
     # Spawn on an XY ring (z=0) so meteors stay aligned with the player's shooting plane
     R = 900.0
-    th = random.uniform(0, 2*math.pi)
-    x = R*math.cos(th)
-    y = R*math.sin(th)
-    z = 0.0
-    dir_to_origin = norm3([-x, -y, -z])  # z=0 → velocity lies in the XY plane
-    v = [dir_to_origin[0]*METEOR_SPEED, dir_to_origin[1]*METEOR_SPEED, dir_to_origin[2]*METEOR_SPEED]
-    return {"pos":[x,y,z], "vel":v}
-
+    th = numpy.random.uniform(0, 2*math.pi, len(idx))
+    c, s = numpy.cos(th), numpy.sin(th)
+    meteor_pos[idx, 0] = R*c; meteor_pos[idx, 1] = R*s; meteor_pos[idx, 2] = 0.0
+    # heading straight for the origin, in the XY plane
+    meteor_vel[idx, 0] = -c*METEOR_SPEED; meteor_vel[idx, 1] = -s*METEOR_SPEED; meteor_vel[idx, 2] = 0.0
 
-def spawn_alien():
-    # Spawn aliens in the same shooting plane (z=0) so they are always hittable
-    r = random.uniform(420.0, 640.0)
-    a = random.uniform(0, 360)
-    x = r * math.cos(math.radians(a))
-    y = r * math.sin(math.radians(a))
-    z = 0.0  # keep on XY plane
-    return {"pos": [x, y, z], "dir_theta": random.uniform(0, 360), "radius": r, "speed": ALIEN_BASE_SPEED}
 
 # -------------------------------
 # Drawing
 # -------------------------------
 
+# window pixel coordinates; called from the hud_layer painters
 def draw_text_2d(x, y, s, font=GLUT_BITMAP_HELVETICA_18):
-    glMatrixMode(GL_PROJECTION)
-    glPushMatrix(); glLoadIdentity(); gluOrtho2D(0, WIN_W, 0, WIN_H)
-    glMatrixMode(GL_MODELVIEW)
-    glPushMatrix(); glLoadIdentity()
     glColor3f(0.95, 0.95, 1.0)
-    glRasterPos2f(x, y)
-    for ch in s: glutBitmapCharacter(font, ord(ch))
-    glPopMatrix(); glMatrixMode(GL_PROJECTION); glPopMatrix(); glMatrixMode(GL_MODELVIEW)
+    draw_string(x, y, s, font)
+
+
+def sphere_mesh(slices, stacks, wire):
+    # Unit sphere laid out like gluSphere: stacks from +z to -z, slices around z.
+    # Returns (vertices, indices, mode); the vertices double as normals.
+    key = (slices, stacks, wire)
+    if key in sphere_meshes:
+        return sphere_meshes[key]
+    phi = numpy.linspace(0.0, math.pi, stacks + 1)[:, None]
+    theta = numpy.linspace(0.0, 2*math.pi, slices + 1)[None, :]
+    verts = numpy.stack([numpy.sin(phi)*numpy.cos(theta),
+                         numpy.sin(phi)*numpy.sin(theta),
+                         numpy.cos(phi)*numpy.ones_like(theta)], axis=-1)
+    verts = numpy.ascontiguousarray(verts.reshape(-1, 3), dtype=numpy.float32)
+
+    row = slices + 1
+    a = (numpy.arange(stacks)[:, None]*row + numpy.arange(slices)[None, :]).ravel()  # corner of each quad
+    b = a + row                                                                     # the one below it
+    if wire:
+        rings = a[a >= row]  # no rings at the poles
+        idx = numpy.concatenate([numpy.stack([rings, rings + 1], axis=1), numpy.stack([a, b], axis=1)])
+        mode = GL_LINES
+    else:
+        idx = numpy.concatenate([numpy.stack([a, b, a + 1], axis=1), numpy.stack([a + 1, b, b + 1], axis=1)])
+        mode = GL_TRIANGLES
+    mesh = (verts, numpy.ascontiguousarray(idx.ravel(), dtype=numpy.uint32), mode)
+    sphere_meshes[key] = mesh
+    return mesh
 
 
 def draw_sphere(r, color=(1,1,1), slices=24, stacks=24, wire=False, alpha=1.0):
     glColor4f(color[0], color[1], color[2], alpha)
-    quad = gluNewQuadric()
-    if wire:
-        gluQuadricDrawStyle(quad, GLU_LINE)
-    gluSphere(quad, r, slices, stacks)
+    verts, idx, mode = sphere_mesh(slices, stacks, wire)
+    glPushMatrix()
+    glScalef(r, r, r)
+    glEnableClientState(GL_VERTEX_ARRAY); glEnableClientState(GL_NORMAL_ARRAY)
+    glVertexPointer(3, GL_FLOAT, 0, verts)
+    glNormalPointer(GL_FLOAT, 0, verts)
+    glDrawElements(mode, len(idx), GL_UNSIGNED_INT, idx)
+    glDisableClientState(GL_NORMAL_ARRAY); glDisableClientState(GL_VERTEX_ARRAY)
+    glPopMatrix()
 
 
 def draw_player():
@@ -234,47 +728,94 @@ def draw_planet_and_shield():
 
 
 def draw_bullets():
+    live = bullets.active()
+    if not len(live): return
+    pos = bullets.pos[live]
+    glColor3f(1.0, 0.4, 0.2)
     if BULLET_AS_POINTS:
         glPointSize(POINT_SIZE)
-        glBegin(GL_POINTS)
-        glColor3f(1.0, 0.4, 0.2)
-        for b in bullets:
-            glVertex3f(b["pos"][0], b["pos"][1], b["pos"][2])
-        glEnd()
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, numpy.ascontiguousarray(pos, dtype=numpy.float32))
+        glDrawArrays(GL_POINTS, 0, len(pos))
+        glDisableClientState(GL_VERTEX_ARRAY)
     else:
-        glColor3f(1.0, 0.4, 0.2)
-        for b in bullets:
-            glPushMatrix(); glTranslatef(b["pos"][0], b["pos"][1], b["pos"][2])
+        for x, y, z in pos.tolist():
+            glPushMatrix(); glTranslatef(x, y, z)
             glutSolidSphere(4, 10, 10)
             glPopMatrix()
 
 
+def sphere_list(r, slices):
+    key = (r, slices)
+    if key not in sphere_lists:
+        lst = glGenLists(1)
+        glNewList(lst, GL_COMPILE)
+        glutSolidSphere(r, slices, slices)
+        glEndList()
+        sphere_lists[key] = lst
+    return sphere_lists[key]
+
+
+def draw_bodies(pos, r, slices):
+    # Same-sized spheres at pos (n x 3). Ones that cover SPRITE_MAX_PX or more
+    # on screen replay a cached sphere; the rest are points, one draw call per
+    # whole-pixel size.
+    if not len(pos): return
+    dist = numpy.sqrt(((pos - cam_eye)**2).sum(axis=1))
+    px = 2*r*PX_PER_UNIT / numpy.maximum(dist, 1e-6)
+    near = px >= SPRITE_MAX_PX
+
+    if near.any():
+        lst = sphere_list(r, slices)
+        for x, y, z in pos[near].tolist():
+            glPushMatrix(); glTranslatef(x, y, z)
+            glCallList(lst)
+            glPopMatrix()
+
+    far = ~near
+    if far.any():
+        size = numpy.maximum(numpy.rint(px[far]), 1.0)
+        order = numpy.argsort(size, kind="stable")
+        size = size[order]
+        pts = numpy.ascontiguousarray(pos[far][order], dtype=numpy.float32)
+        sizes, first = numpy.unique(size, return_index=True)
+        last = numpy.append(first[1:], len(size))
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, pts)
+        for s, a, b in zip(sizes.tolist(), first.tolist(), last.tolist()):
+            glPointSize(s)
+            glDrawArrays(GL_POINTS, a, b - a)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+
 def draw_meteors():
     glColor3f(0.6, 0.5, 0.4)
-    for m in meteors:
-        glPushMatrix(); glTranslatef(m["pos"][0], m["pos"][1], m["pos"][2])
-        glutSolidSphere(12, 12, 12)
-        glPopMatrix()
+    draw_bodies(meteor_pos, METEOR_R, 12)
 
 
 def draw_aliens():
     glColor3f(1.0, 0.2, 0.2)
-    for a in aliens:
-        glPushMatrix(); glTranslatef(a["pos"][0], a["pos"][1], a["pos"][2])
-        glutSolidSphere(14, 14, 14)
-        glPopMatrix()
+    draw_bodies(aliens.pos[:aliens.count], ALIEN_R, 14)
+
+
+def draw_moons():
+    if not (gravity and len(moons)): return
+    xy = moons.positions(clock.now())
+    glColor3f(0.75, 0.75, 0.8)
+    draw_bodies(numpy.column_stack((xy, numpy.zeros(len(xy)))), MOON_R, 10)
 
 
 def draw_explosions():
-    if not explosions: return
+    live = explosions.active()
+    if not len(live): return
+    t = (clock.now() - explosions.born[live]) / explosions.life[live]
+    radius = explosions.size[live] * (1.0 + 2.0*t)
+    alpha = numpy.maximum(0.0, 1.0 - t)
     glEnable(GL_BLEND)
     glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-    for e in explosions:
-        age = now() - e["born"]
-        t = age / e["life"]
-        alpha = max(0.0, 1.0 - t)
-        glPushMatrix(); glTranslatef(e["pos"][0], e["pos"][1], e["pos"][2])
-        draw_sphere(e["r"]*(1.0 + 2.0*t), (1.0,0.7,0.2), alpha=alpha, slices=14, stacks=14)
+    for (x, y, z), r, a in zip(explosions.pos[live].tolist(), radius.tolist(), alpha.tolist()):
+        glPushMatrix(); glTranslatef(x, y, z)
+        draw_sphere(r, (1.0,0.7,0.2), alpha=a, slices=14, stacks=14)
         glPopMatrix()
     glDisable(GL_BLEND)
 
@@ -294,10 +835,22 @@ def draw_nova_pickup():
 # -------------------------------
 
 def draw_centered_line(y, text):
-    x = max(10, WIN_W//2 - int(len(text)*9/2))
+    x = max(10, WIN_W//2 - text_width(text)//2)
     draw_text_2d(x, y, text)
 
 
+def draw_hud():
+    if game_state == GAME_OVER:
+        draw_text_2d(10, WIN_H-24, f"GAME OVER — Score: {player_score}   Press R to Restart   |   Z: Menu")
+    else:
+        line1 = f"Life: {player_life}   Score: {player_score}   Shield: {'ON' if (shield_active and shield_time_left>0) else 'OFF'}   Nova: {nova_charges}/{NOVA_MAX_CHARGES}"
+        line2 = f"Camera: {'Free' if free_cam else 'Follow'}   Cheat: {'ON' if cheat else 'OFF'}   Gravity: {'ON' if gravity else 'OFF'}   {'PAUSED' if paused else ''}"
+        draw_text_2d(10, WIN_H-24, line1)
+        draw_text_2d(10, WIN_H-48, line2)
+        if paused:
+            draw_centered_line(WIN_H//2, "PAUSED")
+
+
 def draw_main_menu():
     draw_centered_line(WIN_H//2 + 80, "PLANET GUARDIAN 3D")
     draw_centered_line(WIN_H//2 + 40, "Press G to Start")
@@ -318,6 +871,8 @@ def draw_controls_page():
         "F: Nova Bomb (uses 1 charge)",
         "Shoot the golden orb to gain a nova charge",
         "C: Toggle Cheat",
+        "V: Launch Alien Swarm Wave",
+        "N: Toggle Gravity (planet and moons pull bullets and meteors)",
         "P: Pause/Unpause",
         "R: Restart (after Game Over)",
         "Z: Back to Menu   |   G: Start Game   |   Q: Quit"
@@ -336,7 +891,9 @@ def setup_camera():
 
     glMatrixMode(GL_MODELVIEW); glLoadIdentity()
 
+    global cam_eye
     if game_state in (GAME_MENU, GAME_CONTROLS):
+        cam_eye = (0.0, -800.0, 320.0)
         gluLookAt(0, -800, 320, 0, 0, 0, 0, 0, 1)
         return
 
@@ -346,12 +903,14 @@ def setup_camera():
         cx = r*math.cos(pitch)*math.cos(yaw)
         cy = r*math.cos(pitch)*math.sin(yaw)
         cz = r*math.sin(pitch)
+        cam_eye = (cx, cy, cz)
         gluLookAt(cx, cy, cz, 0,0,0, 0,0,1)
     else:
         pos = player_pos(); t = player_tangent_dir()
         behind = [-t[0]*80, -t[1]*80, 60]
         eye = [pos[0]+behind[0], pos[1]+behind[1], behind[2]]
         center = [pos[0]+t[0]*100, pos[1]+t[1]*100, 20]
+        cam_eye = tuple(eye)
         gluLookAt(eye[0], eye[1], eye[2], center[0], center[1], center[2], 0,0,1)
 
 
@@ -359,25 +918,28 @@ def setup_camera():
 # Physics & Game Logic
 # -------------------------------
 
+def add_explosion(pos, r, life):
+    explosions.spawn(pos, clock.now(), life, size=r)
+
+
 def fire_bullet():
-    global bullets
     if game_state != GAME_PLAYING or paused: return
     pos = player_pos(); t = player_tangent_dir()
     v = [t[0]*BULLET_SPEED, t[1]*BULLET_SPEED, t[2]*BULLET_SPEED]
-    bullets.append({"pos":[pos[0], pos[1], pos[2]], "vel":v, "born":now()})
+    bullets.spawn(pos, clock.now(), BULLET_LIFE, vel=v)
 
 
 def schedule_nova_next():
     global nova_pickup_active, nova_spawn_at, nova_expires_at
     nova_pickup_active = False
-    t = now()
+    t = clock.now()
     nova_spawn_at = t + random.uniform(NOVA_RESPAWN_MIN, NOVA_RESPAWN_MAX)
     nova_expires_at = 0.0
 
 
 def update_nova_pickup(dt):
-    global nova_pickup_active, nova_pickup_pos, nova_expires_at
-    t = now()
+    global nova_pickup_active, nova_pickup_pos, nova_expires_at, nova_spawned
+    t = clock.now()
     if not nova_pickup_active and t >= nova_spawn_at and game_state == GAME_PLAYING and not paused:
         # Spawn a pickup on an in-plane ring
         r = random.uniform(300.0, 700.0)
@@ -385,6 +947,7 @@ def update_nova_pickup(dt):
         nova_pickup_pos = [r*math.cos(math.radians(a)), r*math.sin(math.radians(a)), 0.0]
         nova_pickup_active = True
         nova_expires_at = t + NOVA_LIFE_SECS
+        nova_spawned += 1
     elif nova_pickup_active and t >= nova_expires_at:
         schedule_nova_next()
 
@@ -395,122 +958,182 @@ def activate_nova():
     if nova_charges <= 0: return
     nova_charges -= 1
     # Explode all current enemies and award score
-    for m in meteors:
-        explosions.append({"pos":m["pos"][:], "r":20, "born":now(), "life":0.5})
+    for p in meteor_pos.tolist():
+        add_explosion(p, 20, 0.5)
         player_score += 1
-    for a in aliens:
-        explosions.append({"pos":a["pos"][:], "r":24, "born":now(), "life":0.6})
+    for p in aliens.pos[:aliens.count].tolist():
+        add_explosion(p, 24, 0.6)
         player_score += 2
     reset_enemies()  # keep challenge constant
 
 
 def update_bullets(dt):
-    global bullets, player_score, nova_charges
-    i = 0
-    while i < len(bullets):
-        b = bullets[i]
-        # advance
-        b["pos"][0] += b["vel"][0]*dt
-        b["pos"][1] += b["vel"][1]*dt
-        b["pos"][2] += b["vel"][2]*dt
-        # expire
-        if now() - b["born"] > BULLET_LIFE:
-            bullets.pop(i); continue
-
-        # pickup collision first (so bullets can grab charges)
-        if nova_pickup_active:
-            if length3([b["pos"][0]-nova_pickup_pos[0], b["pos"][1]-nova_pickup_pos[1], 0.0]) < 16:
-                nova_charges = min(NOVA_MAX_CHARGES, nova_charges + 1)
-                explosions.append({"pos":nova_pickup_pos[:], "r":18, "born":now(), "life":0.4})
-                schedule_nova_next()
-                bullets.pop(i); continue
-
-        # collision with meteors
-        hit = False
-        for m in meteors:
-            if length3([b["pos"][0]-m["pos"][0], b["pos"][1]-m["pos"][1], b["pos"][2]-m["pos"][2]]) < 16:
-                spawn = spawn_meteor(); m["pos"] = spawn["pos"]; m["vel"] = spawn["vel"]
-                explosions.append({"pos":m["pos"][:], "r":16, "born":now(), "life":0.6})
-                player_score += 1
-                hit = True
-                break
-        if hit: bullets.pop(i); continue
-
-        # collision with aliens
-        hit = False
-        for a in aliens:
-            if length3([b["pos"][0]-a["pos"][0], b["pos"][1]-a["pos"][1], b["pos"][2]-a["pos"][2]]) < 18:
-                newa = spawn_alien(); a.update(newa)
-                explosions.append({"pos":a["pos"][:], "r":18, "born":now(), "life":0.6})
-                player_score += 2
-                hit = True
-                break
-        if hit: bullets.pop(i); continue
-
-        i += 1
+    global player_score, nova_charges, nova_collected
+    # advance and expire all bullets at once; each sweeps a segment from start to its new pos
+    live = bullets.active()
+    if not len(live): return
+    start = bullets.pos[live, :2].copy()
+    bullets.pos[live] += bullets.vel[live]*dt
+    bullets.expire(clock.now())
+
+    kept = bullets.alive[live]
+    live = live[kept]; start = start[kept]
+    if not len(live): return
+
+    # targets (pickup, meteors, aliens) where they start this update and how far they move in it,
+    # all on z=0 so only x/y count; meteors and aliens move after the bullets with these same steps
+    n_pick = 1 if nova_pickup_active else 0
+    n_met = len(meteor_pos)
+    alien_xy = aliens.pos[:aliens.count, :2]
+    pp = player_pos()
+    alien_d = aliens.velocity(dt, pp[0], pp[1]) * dt
+    tx = numpy.concatenate(([nova_pickup_pos[0]] * n_pick, meteor_pos[:, 0], alien_xy[:, 0]))
+    ty = numpy.concatenate(([nova_pickup_pos[1]] * n_pick, meteor_pos[:, 1], alien_xy[:, 1]))
+    tdx = numpy.concatenate(([0.0] * n_pick, meteor_vel[:, 0]*dt, alien_d[:, 0]))
+    tdy = numpy.concatenate(([0.0] * n_pick, meteor_vel[:, 1]*dt, alien_d[:, 1]))
+    tr2 = numpy.concatenate(([PICKUP_HIT_R**2] * n_pick, [METEOR_HIT_R**2] * n_met, [ALIEN_HIT_R**2] * aliens.count))
+    target_grid.build(tx, ty)
+
+    # bin the bullets by segment midpoint: bullets sharing a cell share one lookup,
+    # reaching far enough to cover the whole segment and anything moving into it
+    sx, sy = start[:, 0], start[:, 1]
+    dx = bullets.pos[live, 0] - sx; dy = bullets.pos[live, 1] - sy
+    cells, group = numpy.unique(target_grid.cells(sx + dx/2, sy + dy/2), return_inverse=True)
+    reach = (max(PICKUP_HIT_R, METEOR_HIT_R, ALIEN_HIT_R) + math.sqrt((dx*dx + dy*dy).max())/2
+             + (math.sqrt((tdx*tdx + tdy*tdy).max()) if len(tdx) else 0.0))
+    hits = []  # (hit time, bullet slot, target) for every bullet / target pair that touches
+    for g, cell in enumerate(cells.tolist()):
+        cand = target_grid.near(cell, reach)
+        if not len(cand): continue
+        rows = numpy.flatnonzero(group == g)
+        # bullet relative to the target: first s in [0, 1] with |f + s*d| < r
+        fx = sx[rows, None] - tx[cand]; fy = sy[rows, None] - ty[cand]
+        rx = dx[rows, None] - tdx[cand]; ry = dy[rows, None] - tdy[cand]
+        a = rx*rx + ry*ry
+        b = fx*rx + fy*ry
+        c = fx*fx + fy*fy - tr2[cand]
+        disc = b*b - a*c
+        inside = c < 0
+        s = numpy.zeros(c.shape)
+        cross = ~inside & (a > 0) & (disc > 0)
+        s[cross] = (-b[cross] - numpy.sqrt(disc[cross])) / a[cross]
+        touch = inside | (cross & (s >= 0) & (s <= 1))
+        r, t = numpy.nonzero(touch)
+        hits += zip(s[r, t].tolist(), live[rows[r]].tolist(), cand[t].tolist())
+    hits.sort()
+
+    # resolve earliest hit first, over all pairs; a bullet stops at its first target, and a
+    # target that was hit has respawned and is out of reach this update
+    taken = set()
+    dead_aliens = []
+    for _, i, k in hits:
+        if k in taken or not bullets.alive[i]: continue
+        taken.add(k)
+        if k < n_pick:
+            # shooting the pickup gives a nova charge
+            nova_charges = min(NOVA_MAX_CHARGES, nova_charges + 1)
+            nova_collected += 1
+            add_explosion(nova_pickup_pos, 18, 0.4)
+            schedule_nova_next()
+        elif k < n_pick + n_met:
+            j = k - n_pick
+            hit_pos = meteor_pos[j].copy()
+            respawn_meteors([j])
+            add_explosion(hit_pos, 16, 0.6)
+            player_score += 1
+        else:
+            j = k - n_pick - n_met
+            dead_aliens.append(j)
+            add_explosion(aliens.pos[j], 18, 0.6)
+            player_score += 2
+        bullets.kill(i)
+    aliens.replace(dead_aliens)
+
+
+# pull of the planet and the moons at each (px, py)
+def gravity_accel(px, py):
+    w = -GRAVITY_GM / (px*px + py*py + GRAVITY_SOFTEN**2)**1.5
+    ax, ay = px*w, py*w
+    if len(moons):
+        xy = moons.positions(clock.now())
+        if len(moons) >= BH_MIN_MOONS:
+            moon_tree.build(xy, moons.gm)
+            mx, my = moon_tree.accel(px, py)
+        else:
+            mx, my = pull_direct(px, py, xy[:, 0], xy[:, 1], moons.gm)
+        ax += mx; ay += my
+    return ax, ay
+
+
+def apply_gravity(dt):
+    # kick bullet and meteor velocities; update_bullets/update_meteors then move them with it
+    live = bullets.active()
+    nb = len(live)
+    ax, ay = gravity_accel(numpy.concatenate((bullets.pos[live, 0], meteor_pos[:, 0])),
+                           numpy.concatenate((bullets.pos[live, 1], meteor_pos[:, 1])))
+    bullets.vel[live, 0] += ax[:nb]*dt; bullets.vel[live, 1] += ay[:nb]*dt
+    meteor_vel[:, 0] += ax[nb:]*dt; meteor_vel[:, 1] += ay[nb:]*dt
+
+
+def toggle_gravity():
+    global gravity
+    gravity = not gravity
+    if not gravity:
+        # meteors head straight for the planet at METEOR_SPEED again, as they do without gravity
+        d = numpy.hypot(meteor_pos[:, 0], meteor_pos[:, 1])
+        k = METEOR_SPEED / numpy.maximum(d, 1e-9)
+        meteor_vel[:, 0] = -meteor_pos[:, 0]*k; meteor_vel[:, 1] = -meteor_pos[:, 1]*k; meteor_vel[:, 2] = 0.0
 
 
 def update_meteors(dt):
-    global player_life, game_state
-    for m in meteors:
-        m["pos"][0] += m["vel"][0]*dt
-        m["pos"][1] += m["vel"][1]*dt
-        m["pos"][2] += m["vel"][2]*dt
-        d = length3(m["pos"])  # z=0 → planar distance
-        collide_r = PLANET_R + (12 if (shield_active and shield_time_left>0) else 0)
-        if d <= collide_r:
-            if shield_active and shield_time_left>0:
-                explosions.append({"pos":m["pos"][:], "r":20, "born":now(), "life":0.5})
-            else:
-                player_hit()
-            s = spawn_meteor(); m["pos"] = s["pos"]; m["vel"] = s["vel"]
+    meteor_pos[:] += meteor_vel*dt
+    d = numpy.hypot(meteor_pos[:, 0], meteor_pos[:, 1])  # z=0 → planar distance
+    collide_r = PLANET_R + (12 if (shield_active and shield_time_left>0) else 0)
+    hit = numpy.flatnonzero(d <= collide_r)
+    for j in hit.tolist():
+        if shield_active and shield_time_left>0:
+            add_explosion(meteor_pos[j], 20, 0.5)
+        else:
+            player_hit()
+    if len(hit): respawn_meteors(hit)
 
 
 def update_aliens(dt):
     pp = player_pos()  # z=0 by design
-    for a in aliens:
-        a["dir_theta"] += 30.0 * dt
-        rad = math.radians(a["dir_theta"])
-        desired = [a["radius"] * math.cos(rad), a["radius"] * math.sin(rad), 0.0]
-        to_des = [desired[0] - a["pos"][0], desired[1] - a["pos"][1], 0.0]
-        to_player = [pp[0] - a["pos"][0], pp[1] - a["pos"][1], 0.0]
-        v = [to_des[0] * 0.6 + to_player[0] * 0.4, to_des[1] * 0.6 + to_player[1] * 0.4, 0.0]
-        v = norm3(v)
-        a["pos"][0] += v[0] * a["speed"] * dt
-        a["pos"][1] += v[1] * a["speed"] * dt
-        a["pos"][2]  = 0.0
-        d = length3(a["pos"])  # z=0 distance
-        collide_r = PLANET_R + (12 if (shield_active and shield_time_left > 0) else 0)
-        if d <= collide_r:
-            if shield_active and shield_time_left > 0:
-                explosions.append({"pos": a["pos"][:], "r": 24, "born": now(), "life": 0.6})
-            else:
-                player_hit()
-            na = spawn_alien(); a.update(na)
+    aliens.steer(dt, pp[0], pp[1])
+    pos = aliens.pos[:aliens.count]
+    d = numpy.hypot(pos[:, 0], pos[:, 1])  # z=0 distance
+    collide_r = PLANET_R + (12 if (shield_active and shield_time_left > 0) else 0)
+    hit = numpy.flatnonzero(d <= collide_r)
+    for j in hit.tolist():
+        if shield_active and shield_time_left > 0:
+            add_explosion(pos[j], 24, 0.6)
+        else:
+            player_hit()
+    aliens.replace(hit)
+
+
+def launch_swarm_wave():
+    if game_state != GAME_PLAYING or paused: return
+    aliens.add(SWARM_WAVE_SIZE)
 
 
 def update_explosions():
-    i = 0
-    t = now()
-    while i < len(explosions):
-        if t - explosions[i]["born"] > explosions[i]["life"]:
-            explosions.pop(i)
-        else:
-            i += 1
+    explosions.expire(clock.now())
 
 
 def player_hit():
     global player_life, game_state
     if player_life > 0:
         player_life -= 1
-        explosions.append({"pos":[0,0,0], "r":PLANET_R, "born":now(), "life":0.45})
+        add_explosion((0.0, 0.0, 0.0), PLANET_R, 0.45)
         if player_life <= 0:
             game_state = GAME_OVER
 
 
 def activate_shield():
     global shield_active, shield_time_left, shield_last_used
-    t = now()
+    t = clock.now()
     if t - shield_last_used < SHIELD_COOLDOWN: return
     shield_active = True
     shield_time_left = SHIELD_MAX
@@ -548,41 +1171,40 @@ def display():
     draw_planet_and_shield()
 
     if game_state == GAME_MENU:
-        draw_main_menu(); glutSwapBuffers(); return
+        hud_layer.draw(game_state, draw_main_menu, WIN_W, WIN_H)
+        glutSwapBuffers(); return
 
     if game_state == GAME_CONTROLS:
-        draw_controls_page(); glutSwapBuffers(); return
+        hud_layer.draw(game_state, draw_controls_page, WIN_W, WIN_H)
+        glutSwapBuffers(); return
 
     # enemies & pickups
-    draw_meteors(); draw_aliens(); draw_nova_pickup()
+    draw_meteors(); draw_aliens(); draw_moons(); draw_nova_pickup()
 
     # player & bullets & explosions
     draw_player(); draw_bullets(); draw_explosions()
 
     # HUD
-    if game_state == GAME_OVER:
-        draw_text_2d(10, WIN_H-24, f"GAME OVER — Score: {player_score}   Press R to Restart   |   Z: Menu")
-    else:
-        line1 = f"Life: {player_life}   Score: {player_score}   Shield: {'ON' if (shield_active and shield_time_left>0) else 'OFF'}   Nova: {nova_charges}/{NOVA_MAX_CHARGES}"
-        line2 = f"Camera: {'Free' if free_cam else 'Follow'}   Cheat: {'ON' if cheat else 'OFF'}   {'PAUSED' if paused else ''}"
-        draw_text_2d(10, WIN_H-24, line1)
-        draw_text_2d(10, WIN_H-48, line2)
-        if paused:
-            draw_centered_line(WIN_H//2, "PAUSED")
+    key = (game_state, player_life, player_score, shield_active and shield_time_left > 0,
+           nova_charges, free_cam, cheat, gravity, paused)
+    hud_layer.draw(key, draw_hud, WIN_W, WIN_H)
 
     glutSwapBuffers()
 
 
 def compute_dt():
     global _last_time
-    t = now(); dt = t - _last_time; _last_time = t
+    t = time.perf_counter(); dt = t - _last_time; _last_time = t
     return dt
 
 
-def idle():
-    dt = compute_dt()
+# advance the game by dt seconds of game time; no GL calls, so it also runs headless
+def step(dt):
+    if game_state == GAME_PLAYING and paused: return  # frozen, timers included
+    clock.advance(dt)
 
-    if game_state == GAME_PLAYING and not paused:
+    if game_state == GAME_PLAYING:
+        if gravity: apply_gravity(dt)
         update_bullets(dt)
         update_meteors(dt)
         update_aliens(dt)
@@ -592,9 +1214,65 @@ def idle():
     # pickups and fx update regardless (timers/expiry)
     update_nova_pickup(dt)
     update_explosions()
+
+
+def idle():
+    scheduler.wait()
+    step(compute_dt())
     glutPostRedisplay()
 
 
+def fast_forward(seconds, dt=1/60, speed=0.0):
+    # Play `seconds` of game time headless in steps of dt, with cheat mode
+    # doing the aiming and firing and a restart after every game over.
+    # speed > 0 paces it at that multiple of real time, 0 runs flat out.
+    global game_state, cheat
+    set_clock(SimClock())
+    soft_reset(); game_state = GAME_PLAYING; cheat = True
+    games, total_score = 1, 0
+    start = time.perf_counter()
+    steps = int(round(seconds / dt))
+    for n in range(steps):
+        step(dt)
+        if game_state == GAME_OVER:
+            total_score += player_score
+            games += 1
+            soft_reset(); game_state = GAME_PLAYING
+        if speed > 0:
+            delay = start + (n + 1)*dt/speed - time.perf_counter()
+            if delay > 0: time.sleep(delay)
+    total_score += player_score
+    return {"game_time": clock.now(), "wall_time": time.perf_counter() - start, "games": games,
+            "score": total_score, "nova_spawned": nova_spawned, "nova_collected": nova_collected}
+
+
+def bench_gravity(counts, queries=2000, reps=3):
+    # Seconds for one gravity update of `queries` projectiles against each
+    # number of moons in counts: quadtree build and walk vs direct summation,
+    # best of reps, with the tree's median and 99th percentile error relative
+    # to the direct pull (the worst points are where the moons' pulls cancel).
+    r = numpy.random.uniform(PLANET_R, 900.0, queries)
+    a = numpy.random.uniform(0, 2*math.pi, queries)
+    px, py = r*numpy.cos(a), r*numpy.sin(a)
+    rows = []
+    for n in counts:
+        m = Moons(n)
+        xy = m.positions(0.0)
+        tree = QuadTree()
+        t_build = t_walk = t_direct = math.inf
+        for _ in range(reps):
+            t0 = time.perf_counter(); tree.build(xy, m.gm)
+            t1 = time.perf_counter(); tx, ty = tree.accel(px, py)
+            t2 = time.perf_counter(); dx, dy = pull_direct(px, py, xy[:, 0], xy[:, 1], m.gm)
+            t3 = time.perf_counter()
+            t_build = min(t_build, t1 - t0); t_walk = min(t_walk, t2 - t1); t_direct = min(t_direct, t3 - t2)
+        err = numpy.hypot(tx - dx, ty - dy) / numpy.maximum(numpy.hypot(dx, dy), 1e-300)
+        p50, p99 = numpy.percentile(err, [50, 99]) if n else (0.0, 0.0)
+        rows.append({"moons": n, "build": t_build, "walk": t_walk, "direct": t_direct,
+                     "err_p50": float(p50), "err_p99": float(p99)})
+    return rows
+
+
 def keyboard(key, x, y):
     global orbit_theta, orbit_r, free_cam, cheat, paused
     global player_life, player_score, game_state, nova_charges
@@ -638,6 +1316,12 @@ def keyboard(key, x, y):
     if k == b'f':
         activate_nova(); return
 
+    if k == b'v':
+        launch_swarm_wave(); return
+
+    if k == b'n':
+        toggle_gravity(); return
+
     if paused:
         if k == b'c':
             cheat = not cheat
@@ -696,7 +1380,7 @@ def init_gl():
 def soft_reset():
     global player_life, player_score, orbit_r, orbit_theta
     global bullets, explosions, shield_active, shield_time_left
-    global meteors, aliens, paused, nova_charges
+    global aliens, paused, nova_charges
     player_life = START_LIFE
     player_score = 0
     orbit_r = PLAYER_INIT_R
@@ -710,8 +1394,8 @@ def soft_reset():
 
 
 def reset_enemies():
-    meteors[:] = [spawn_meteor() for _ in range(NUM_METEORS)]
-    aliens[:] = [spawn_alien() for _ in range(NUM_ALIENS)]
+    respawn_meteors(numpy.arange(NUM_METEORS))
+    aliens.reset(NUM_ALIENS)
 
 
 def main():
@@ -736,4 +1420,35 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Planet Guardian 3D")
+    parser.add_argument("--fast-forward", type=float, metavar="SECONDS",
+                        help="play SECONDS of game time headless in cheat mode and print the result")
+    parser.add_argument("--dt", type=float, default=1/60, help="game time per step for --fast-forward")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="pace --fast-forward at this multiple of real time (0 = as fast as possible)")
+    parser.add_argument("--nova-min", type=float, default=NOVA_RESPAWN_MIN)
+    parser.add_argument("--nova-max", type=float, default=NOVA_RESPAWN_MAX)
+    parser.add_argument("--gravity", action="store_true", help="start with gravity mode on")
+    parser.add_argument("--moons", type=int, default=NUM_MOONS, help="moons pulling in gravity mode")
+    parser.add_argument("--bench-gravity", type=int, nargs="*", metavar="MOONS",
+                        help="time one gravity update against each number of moons (default 16 to 16384) and exit")
+    parser.add_argument("--bench-queries", type=int, default=2000, help="bullets and meteors for --bench-gravity")
+    args = parser.parse_args()
+    NOVA_RESPAWN_MIN, NOVA_RESPAWN_MAX = args.nova_min, args.nova_max
+    gravity = args.gravity
+    moons.reset(args.moons)
+    if args.bench_gravity is not None:
+        counts = args.bench_gravity or [16, 64, 256, 1024, 4096, 16384]
+        print(f"{args.bench_queries} bullets/meteors, ms per update (best of 3)")
+        print(f"{'moons':>6} {'build':>8} {'walk':>8} {'tree':>8} {'direct':>8} {'err p50':>8} {'err p99':>8}")
+        for r in bench_gravity(counts, args.bench_queries):
+            print(f"{r['moons']:>6} {r['build']*1e3:>8.2f} {r['walk']*1e3:>8.2f} "
+                  f"{(r['build'] + r['walk'])*1e3:>8.2f} {r['direct']*1e3:>8.2f} {r['err_p50']:>8.4f} {r['err_p99']:>8.4f}")
+    elif args.fast_forward:
+        r = fast_forward(args.fast_forward, args.dt, args.speed)
+        print(f"{r['game_time']:.0f} s game time in {r['wall_time']:.2f} s "
+              f"({r['game_time'] / max(r['wall_time'], 1e-9):.0f}x), {r['games']} games, score {r['score']}")
+        print(f"nova pickups: {r['nova_spawned']} spawned, {r['nova_collected']} collected")
+    else:
+        main()
@@ -0,0 +1,195 @@
+# HUD text for the GLUT games.
+#
+# glutBitmapCharacter() is one call per character, and every game also
+# pushed and popped both matrix stacks around each line, so a few lines of
+# HUD cost hundreds of GL calls a frame. Here each glyph of a GLUT bitmap
+# font is compiled into a display list the first time the font is used and
+# a whole string is drawn with a single glCallLists(). hud() sets up the 2D
+# projection once for all the lines of a HUD pass, and HudLayer keeps a HUD
+# in a texture so it is only drawn again when what it shows changes.
+#
+# Display lists belong to the GL context, so only call these once the
+# window has been created.
+
+from contextlib import contextmanager
+from functools import lru_cache
+
+from OpenGL.GL import *
+from OpenGL.GLU import *
+from OpenGL.GLUT import *
+
+_glyph_bases = {}   # font -> first of 256 display lists, one per character code
+_char_widths = {}   # font -> list of 256 advance widths in pixels
+_fonts = {}         # font key -> font, so the cached functions can take a hashable key
+
+
+# the GLUT font constants are ctypes pointers on some platforms, which can't be dict keys
+def _font_key(font):
+    key = getattr(font, "value", font)
+    _fonts.setdefault(key, font)
+    return key
+
+
+def _encode(text):
+    # glyph lists only cover codes 0..255, anything else has no bitmap and is dropped
+    return text.encode("latin-1", "ignore")
+
+
+def glyph_base(font):
+    key = _font_key(font)
+    base = _glyph_bases.get(key)
+    if base is None:
+        base = glGenLists(256)
+        for code in range(256):
+            glNewList(base + code, GL_COMPILE)
+            glutBitmapCharacter(font, code)
+            glEndList()
+        _glyph_bases[key] = base
+    return base
+
+
+def char_widths(font):
+    key = _font_key(font)
+    widths = _char_widths.get(key)
+    if widths is None:
+        widths = [glutBitmapWidth(font, code) for code in range(256)]
+        _char_widths[key] = widths
+    return widths
+
+
+@lru_cache(maxsize=512)
+def _text_width(key, text):
+    widths = char_widths(_fonts[key])
+    return sum(widths[code] for code in _encode(text))
+
+
+# width of text in pixels
+def text_width(text, font=GLUT_BITMAP_HELVETICA_18):
+    return _text_width(_font_key(font), text)
+
+
+# draw text at the current raster position
+def draw_glyphs(text, font=GLUT_BITMAP_HELVETICA_18):
+    data = _encode(text)
+    if not data:
+        return
+    glListBase(glyph_base(font))
+    glCallLists(data)
+
+
+# draw text with its baseline starting at (x, y); call inside hud() for pixel coordinates
+def draw_string(x, y, text, font=GLUT_BITMAP_HELVETICA_18):
+    glRasterPos2f(x, y)
+    draw_glyphs(text, font)
+
+
+# pixel coordinates with (0, 0) at the bottom left, for everything drawn inside the block
+@contextmanager
+def hud(width, height):
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    gluOrtho2D(0, width, 0, height)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    try:
+        yield
+    finally:
+        glPopMatrix()
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+
+
+# A block of HUD text kept in a texture. The text is only drawn again when
+# the key passed to draw() changes (build it from the values the text shows,
+# e.g. score and lives), every other frame is a single textured quad.
+# Without framebuffer object support the text is drawn directly each frame.
+# draw() sets up its own 2D projection with hud(), so call it outside any
+# hud() block: GL only guarantees a projection stack depth of 2.
+class HudLayer:
+    def __init__(self):
+        self.key = None
+        self.size = None        # texture size in pixels, follows the viewport
+        self.texture = None
+        self.fbo = None
+        self.supported = None   # decided on first draw, once there is a context
+
+    # paint() draws the text inside hud(width, height), as it would on screen
+    def draw(self, key, paint, width, height):
+        if self.supported is None:
+            self.supported = bool(glGenFramebuffers)
+        if not self.supported:
+            with hud(width, height):
+                paint()
+            return
+
+        x, y, w, h = glGetIntegerv(GL_VIEWPORT)
+        if (w, h) != self.size:
+            self._allocate(w, h)
+            if not self.supported:
+                self.draw(key, paint, width, height)
+                return
+        if key != self.key:
+            self._render(paint, width, height)
+            self.key = key
+        self._composite()
+
+    def _allocate(self, w, h):
+        self._release()
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, w, h, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+        self.fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.texture, 0)
+        complete = glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        if not complete:
+            self._release()
+            self.supported = False
+            return
+        self.size = (w, h)
+        self.key = None
+
+    def _release(self):
+        if self.fbo is not None:
+            glDeleteFramebuffers(1, [self.fbo])
+            glDeleteTextures([self.texture])
+        self.fbo = self.texture = self.size = None
+
+    def _render(self, paint, width, height):
+        w, h = self.size
+        glPushAttrib(GL_VIEWPORT_BIT | GL_COLOR_BUFFER_BIT)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, w, h)
+        glClearColor(0, 0, 0, 0)
+        glClear(GL_COLOR_BUFFER_BIT)
+        with hud(width, height):
+            paint()
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glPopAttrib()
+
+    def _composite(self):
+        glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT | GL_TEXTURE_BIT)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_LIGHTING)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE)
+        with hud(1, 1):
+            glBegin(GL_QUADS)
+            glTexCoord2f(0, 0); glVertex2f(0, 0)
+            glTexCoord2f(1, 0); glVertex2f(1, 0)
+            glTexCoord2f(1, 1); glVertex2f(1, 1)
+            glTexCoord2f(0, 1); glVertex2f(0, 1)
+            glEnd()
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glPopAttrib()
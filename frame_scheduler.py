@@ -0,0 +1,94 @@
+# Frame pacing for the GLUT idle loops.
+#
+# Every game used to end its idle callback with glutPostRedisplay() and
+# return straight away, so GLUT called it again immediately and each game
+# kept a CPU core busy. FrameScheduler.wait() at the top of the idle callback
+# sleeps until the next frame is due instead.
+#
+# Games whose speeds are "per update" rather than "per second" can ask for
+# sim_steps() to run their updates at a fixed rate, no matter how fast the
+# frames are drawn.
+
+import time
+
+TARGET_FPS = 60
+
+
+class FrameScheduler:
+    def __init__(self, fps=TARGET_FPS, sim_hz=None, name="game", spin=0.001, report_every=5.0, max_steps=25):
+        self.fps = fps
+        self.period = 1.0 / fps
+        self.sim_hz = sim_hz
+        self.name = name
+        self.spin = spin                    # time.sleep() oversleeps, busy-wait the last bit
+        self.report_every = report_every    # seconds between missed deadline reports, 0 = never
+        self.max_steps = max_steps          # most simulation steps run in one frame
+
+        self.deadline = None
+        self.frames = 0
+        self.missed = 0
+        self._window_start = time.perf_counter()
+        self._window_frames = 0
+        self._window_missed = 0
+
+        self._sim_last = None
+        self._sim_acc = 0.0
+
+    # sleep until the next frame is due; call once per idle callback
+    def wait(self):
+        now = time.perf_counter()
+        if self.deadline is None:
+            self.deadline = now
+        self.deadline += self.period
+
+        late = now - self.deadline
+        if late > 0:
+            self.missed += 1
+            self._window_missed += 1
+            # more than a frame behind: start over from now instead of rushing frames out
+            if late > self.period:
+                self.deadline = now
+        else:
+            if -late > self.spin:
+                time.sleep(-late - self.spin)
+            while time.perf_counter() < self.deadline:
+                pass
+
+        self.frames += 1
+        self._window_frames += 1
+        self._report()
+
+    # number of fixed simulation steps due since the last call
+    def sim_steps(self):
+        now = time.perf_counter()
+        if self._sim_last is None:
+            self._sim_last = now
+        self._sim_acc += now - self._sim_last
+        self._sim_last = now
+
+        step = 1.0 / self.sim_hz
+        n = int(self._sim_acc / step)
+        self._sim_acc -= n * step
+        if n > self.max_steps:
+            # far behind (window dragged, breakpoint...): drop the backlog
+            n = self.max_steps
+            self._sim_acc = 0.0
+        return n
+
+    # how far (0..1) real time is into the next simulation step, for interpolating the drawing
+    def sim_alpha(self):
+        return min(self._sim_acc * self.sim_hz, 1.0)
+
+    def _report(self):
+        if not self.report_every:
+            return
+        now = time.perf_counter()
+        elapsed = now - self._window_start
+        if elapsed < self.report_every:
+            return
+        if self._window_missed:
+            print(f"[{self.name}] {self._window_missed} of {self._window_frames} frames missed "
+                  f"the {self.fps} fps deadline ({self._window_frames / elapsed:.1f} fps)")
+        self._window_start = now
+        self._window_frames = 0
+        self._window_missed = 0
@@ -0,0 +1,142 @@
+# Parity of Diamond Catcher's vectorized rasterize_segments() with the
+# scalar midpoint line code it replaced (detect_zone / zone_change and the
+# per-pixel walk of the original middle_point()), kept here as the reference.
+
+import importlib.util
+import itertools
+import os
+import random
+
+import numpy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAME = os.path.join(ROOT, "Simple Diamond Catcher game  using OpenGL.py")
+
+_spec = importlib.util.spec_from_file_location("diamond_catcher", GAME)
+game = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(game)
+
+
+# the original zone transforms
+def zone_change(point, zone1, zone2):
+    x, y = point
+    if zone1 == 0:
+        current_zone = zone2
+        if current_zone == 0:
+            return (x, y)
+        elif current_zone == 1:
+            return (y, x)
+        elif current_zone == 2:
+            return (-y, x)
+        elif current_zone == 3:
+            return (-x, y)
+        elif current_zone == 4:
+            return (-x, -y)
+        elif current_zone == 5:
+            return (-y, -x)
+        elif current_zone == 6:
+            return (y, -x)
+        elif current_zone == 7:
+            return (x, -y)
+    else:
+        current_zone = zone1
+        if current_zone == 0:
+            return (x, y)
+        elif current_zone == 1:
+            return (y, x)
+        elif current_zone == 2:
+            return (y, -x)
+        elif current_zone == 3:
+            return (-x, y)
+        elif current_zone == 4:
+            return (-x, -y)
+        elif current_zone == 5:
+            return (-y, -x)
+        elif current_zone == 6:
+            return (-y, x)
+        elif current_zone == 7:
+            return (x, -y)
+
+
+def detect_zone(x0, y0, x1, y1):
+    dx = x1 - x0
+    dy = y1 - y0
+    if abs(dx) <= abs(dy):
+        if dx > 0:
+            if dy <= 0:
+                return 6
+            else:
+                return 1
+        else:
+            if dy <= 0:
+                return 5
+            else:
+                return 2
+    else:
+        if dx <= 0:
+            if dy > 0:
+                return 3
+            else:
+                return 4
+        else:
+            if dy > 0:
+                return 0
+            else:
+                return 7
+
+
+# the original middle_point() walk, returning the pixels instead of drawing them
+def line_points(x0, y0, x1, y1):
+    pts = []
+    zone = detect_zone(x0, y0, x1, y1)
+    x0, y0 = zone_change((x0, y0), zone, 0)
+    x1, y1 = zone_change((x1, y1), zone, 0)
+    dx = x1 - x0
+    dy = y1 - y0
+    x, y = x0, y0
+    NE = 2 * dy - 2 * dx
+    E = 2 * dy
+    D = 2 * dy - dx
+
+    while x <= x1:
+        pts.append(zone_change((x, y), 0, zone))
+        x += 1
+        if D > 0:
+            D += NE
+            y += 1
+        else:
+            D += E
+    return pts
+
+
+def assert_parity(segs):
+    got = game.rasterize_segments(segs)
+    start = 0
+    for seg in segs:
+        want = numpy.array(line_points(*seg), dtype=numpy.float64).reshape(-1, 2)
+        part = got[start:start + len(want)]
+        assert len(part) == len(want), seg
+        numpy.testing.assert_allclose(part, want, rtol=0, atol=1e-9, err_msg=str(seg))
+        start += len(want)
+    assert start == len(got)
+
+
+def test_small_grid_covers_every_zone():
+    # every (dx, dy) in [-12, 12]^2: all 8 zones, vertical, horizontal, diagonal and zero length
+    segs = [(3, -4, 3 + dx, -4 + dy) for dx, dy in itertools.product(range(-12, 13), repeat=2)]
+    assert {detect_zone(*seg) for seg in segs} == set(range(8))
+    assert_parity(segs)
+
+
+def test_random_integer_segments():
+    rng = random.Random(0)
+    assert_parity([tuple(rng.randint(-300, 300) for _ in range(4)) for _ in range(2000)])
+
+
+def test_random_float_segments():
+    rng = random.Random(1)
+    assert_parity([tuple(rng.uniform(-300, 300) for _ in range(4)) for _ in range(2000)])
+
+
+def test_no_segments():
+    assert game.rasterize_segments([]).shape == (0, 2)